@@ -2,9 +2,32 @@
 import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
-from ib_insync import IB, util, Contract
+from ib_insync import IB, Contract
 import json
-import pandas as pd
+import numpy as np
+
+from storage import dumps, read_json, write_bytes
+
+# Most recent TRs kept per symbol and candle size. Wilder's smoothing weights a
+# bar 250 back by (13/14)**236, so older TRs no longer move the ATR.
+MAX_TR_HISTORY = 250
+
+def _bar_timestamp_key(bar_date) -> str:
+    """
+    Returns the TR history key for a bar's date. Daily bars carry a plain date,
+    which is keyed as midnight to match the keys already stored in atr_state.
+    """
+    if not isinstance(bar_date, datetime):
+        bar_date = datetime.combine(bar_date, datetime.min.time())
+    return bar_date.isoformat()
+
+def _bars_to_arrays(bars) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the (high, low, close) columns of a list of IB bars as float arrays."""
+    count = len(bars)
+    high = np.fromiter((b.high for b in bars), dtype=np.float64, count=count)
+    low = np.fromiter((b.low for b in bars), dtype=np.float64, count=count)
+    close = np.fromiter((b.close for b in bars), dtype=np.float64, count=count)
+    return high, low, close
 
 class ATRProcessor:
     """
@@ -24,17 +47,17 @@ class ATRProcessor:
         """Loads ATR state (TR history and last ATR) from the JSON file."""
         with self.state_file_lock:
             try:
-                with open(self.atr_state_file, 'r') as f:
-                    return json.load(f)
+                return read_json(self.atr_state_file)
             except (FileNotFoundError, json.JSONDecodeError):
                 return {}
 
     def _save_atr_state(self):
         """Saves the current ATR state to the JSON file."""
+        # Encode before taking the lock so the GUI thread isn't kept waiting on it
+        data = dumps(self.atr_state)
         with self.state_file_lock:
             try:
-                with open(self.atr_state_file, 'w') as f:
-                    json.dump(self.atr_state, f, indent=2)
+                write_bytes(self.atr_state_file, data)
             except IOError as e:
                 logging.error(f"Error saving ATR state: {e}")
 
@@ -42,17 +65,16 @@ class ATRProcessor:
         """Loads the ATR history for graphing from its JSON file."""
         with self.history_file_lock:
             try:
-                with open(self.atr_history_file, 'r') as f:
-                    return json.load(f)
+                return read_json(self.atr_history_file)
             except (FileNotFoundError, json.JSONDecodeError):
                 return {}
 
     def _save_atr_history(self):
         """Saves the current ATR history to its JSON file."""
+        data = dumps(self.atr_history)
         with self.history_file_lock:
             try:
-                with open(self.atr_history_file, 'w') as f:
-                    json.dump(self.atr_history, f, indent=2)
+                write_bytes(self.atr_history_file, data)
             except IOError as e:
                 logging.error(f"Error saving ATR history: {e}")
 
@@ -122,6 +144,12 @@ class ATRProcessor:
                     del self.atr_state[symbol][candle_size]['tr_history'][ts]
                     logging.debug(f"TR History Cleanup: Removed old entry for {symbol} ({candle_size}) at {ts}.")
 
+                # 3. Cap the history length; intraday bars would otherwise keep
+                # up to 100 days' worth. ISO timestamps sort chronologically.
+                if len(symbol_tr_history) > MAX_TR_HISTORY:
+                    for ts in sorted(symbol_tr_history)[:-MAX_TR_HISTORY]:
+                        del symbol_tr_history[ts]
+
         # Also clean up the separate ATR history file
         for symbol in list(self.atr_history.keys()):
             if symbol not in current_symbols:
@@ -159,25 +187,21 @@ class ATRProcessor:
                     del self.atr_history[symbol][candle_size][ts]
                     logging.debug(f"ATR History Cleanup: Removed old ATR entry for {symbol} ({candle_size}) at {ts}.")
                 
-    def _calculate_true_ranges(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculates True Range for each row in a dataframe of historical bars."""
-        if df.empty or len(df) < 2:
-            return pd.DataFrame()
-
-        high = df['high']
-        low = df['low']
-        prev_close = df['close'].shift(1)
-
-        # Calculate the three components of True Range
-        tr1 = high - low
-        tr2 = abs(high - prev_close)
-        tr3 = abs(low - prev_close)
-
-        # The True Range is the maximum of the three
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        # Use .assign() to create a new DataFrame with the 'tr' column, avoiding SettingWithCopyWarning
-        df_with_tr = df.assign(tr=tr)
-        return df_with_tr.dropna() # Drop the first row where TR is NaN
+    def _calculate_true_ranges(self, bars) -> tuple[list[str], np.ndarray]:
+        """
+        Calculates True Range for each historical bar.
+        Returns (timestamp keys, TR array). The first bar has no previous close,
+        so its TR is just high - low.
+        """
+        if len(bars) < 2:
+            return [], np.empty(0)
+
+        high, low, close = _bars_to_arrays(bars)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+
+        # The True Range is the maximum of the three components; fmax skips the NaN
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        return [_bar_timestamp_key(b.date) for b in bars], tr
 
     async def _process_symbol(self, ib: IB, symbol: str, contract_details: dict, candle_size: str):
         """Fetches data and calculates TR/ATR for a single symbol."""
@@ -202,20 +226,9 @@ class ATRProcessor:
                 logging.warning(f"Not enough historical data for {symbol} to calculate TR.")
                 return {'symbol': symbol, 'tr': 0.0, 'atr': None, 'previous_atr': 0.0}
 
-            df = util.df(bars)
-            if df is None or df.empty:
-                logging.warning(f"Could not create DataFrame for {symbol}.")
-                return {'symbol': symbol, 'tr': 0.0, 'atr': None, 'previous_atr': 0.0}
-            
-            # Use all bars, including the last one (current interval), to allow live updates.
-            df['date'] = pd.to_datetime(df['date'])
-            
-            if df.empty or len(df) < 2:
-                logging.warning(f"Not enough bars for {symbol} to calculate TR.")
-                return {'symbol': symbol, 'tr': 0.0, 'atr': None, 'previous_atr': 0.0}
-
-            # Calculate TR for all historical bars
-            tr_df = self._calculate_true_ranges(df)
+            # Calculate TR for all historical bars, including the last one
+            # (current interval), to allow live updates.
+            timestamps, trs = self._calculate_true_ranges(bars)
 
             # --- State Management and Calculation ---
             # The state is now partitioned by symbol, then by candle_size.
@@ -229,11 +242,10 @@ class ATRProcessor:
 
             # Update history with new TRs, overwriting existing keys to ensure the current bar is live
             new_trs_added = 0
-            for _, row in tr_df.iterrows():
-                timestamp_key = row['date'].isoformat()
+            for timestamp_key, tr_value in zip(timestamps, trs.tolist()):
                 if timestamp_key not in tr_history:
                     new_trs_added += 1
-                tr_history[timestamp_key] = row['tr']
+                tr_history[timestamp_key] = tr_value
             
             if new_trs_added > 0:
                 logging.info(f"Added {new_trs_added} new TR values to history for {symbol} ({candle_size}).")
@@ -339,6 +351,10 @@ class ATRProcessor:
         # Cleanup history for symbols no longer in portfolio or old entries
         self._cleanup_history(current_symbols, active_candle_sizes)
 
-        self._save_atr_state()
-        self._save_atr_history()
+        # The file locks are threading locks shared with the GUI thread, so the
+        # blocking save runs in a worker thread instead of on the event loop.
+        await asyncio.gather(
+            asyncio.to_thread(self._save_atr_state),
+            asyncio.to_thread(self._save_atr_history),
+        )
         return results, self.atr_state, self.atr_history
\ No newline at end of file
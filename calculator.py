@@ -153,6 +153,23 @@ class PortfolioCalculator:
 
         return risk_value, percent_risk
 
+    def format_display_fields(self, p_data):
+        """
+        Pre-formats the numeric fields shown in the positions table, so the UI
+        thread only stores strings instead of formatting them on every repaint.
+        """
+        atr_value = p_data.get('atr_value')
+        computed_stop = p_data.get('computed_stop_loss')
+        risk_value = p_data.get('dollar_risk', 0)
+
+        p_data['atr_str'] = f"{atr_value:.4f}" if atr_value is not None else "N/A"
+        p_data['margin_str'] = f"${p_data.get('margin', 0):,.2f}"
+        p_data['avg_cost_str'] = f"{p_data.get('avg_cost', 0.0):,.2f}"
+        p_data['price_str'] = f"{p_data.get('current_price', 0):.2f}"
+        p_data['computed_stop_str'] = f"{computed_stop:.4f}" if computed_stop is not None else "N/A"
+        p_data['dollar_risk_str'] = "NO RISK" if risk_value == "NO RISK" else f"${risk_value:,.2f}"
+        p_data['percent_risk_str'] = f"{p_data.get('percent_risk', 0.0):.2f}%"
+
     def process_positions(self, positions_data, atr_results):
         """
         Takes raw position and ATR data, returns a list of fully calculated position objects for the UI.
@@ -187,6 +204,7 @@ class PortfolioCalculator:
             p_data['percent_risk'] = percent_risk
             p_data['status'] = "Ready" # Default status
             p_data['warning'] = get_symbol_warning(symbol) # Attach any calculation warnings
+            self.format_display_fields(p_data)
 
             processed_data.append(p_data)
 
@@ -1,7 +1,6 @@
 from ib_insync import IB, util, Contract, StopOrder, Order
 from time import sleep
 import asyncio
-import random
 from datetime import datetime
 import logging
 import pytz
@@ -9,21 +8,24 @@ import math
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
 from utils import get_point_value, get_corrected_min_tick
 
-def fetch_positions():
+def fetch_positions(client_id=1000):
     """
     Connects to IBKR and returns a tuple: (results_list, connection_success)
     results_list: list of dicts with position data
     connection_success: True if successfully connected and retrieved data, False otherwise
+    client_id is tried first; on a clientId conflict the next ids up are tried in turn.
     """
     # This function is now a wrapper for staged fetching.
     ib = IB()
     connection_success = False
     positions_data = []
 
-    # Try multiple clientIds in case one is still in use
+    # Try successive clientIds in case one is still in use. Stable ids, unlike
+    # random ones, can't collide with each other and let TWS reuse its state.
     max_retries = 5
+    base_client_id = client_id
     for attempt in range(max_retries):
-        client_id = random.randint(100, 999)
+        client_id = base_client_id + attempt
         try:
             print(f"Attempting to connect with clientId {client_id}...")
             ib.connect('127.0.0.1', 7497, clientId=client_id)
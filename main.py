@@ -2,25 +2,29 @@
 import sys
 import logging
 import threading
-import random
 import json
 import os
 import shutil
+import time
+from functools import lru_cache
 from datetime import datetime, timedelta
 from PyQt6 import QtGui, QtCore
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QDialog, QFormLayout, QLineEdit, QDialogButtonBox, QComboBox,
-    QWidget, QDoubleSpinBox, QTabWidget, QTextEdit, QPushButton, QHeaderView, QAbstractSpinBox,
-    QLabel, QHBoxLayout, QCheckBox, QStyle
+    QApplication, QMainWindow, QTableView, QVBoxLayout, QDialog, QFormLayout, QLineEdit, QDialogButtonBox, QComboBox,
+    QWidget, QDoubleSpinBox, QTabWidget, QPlainTextEdit, QPushButton, QHeaderView, QAbstractSpinBox,
+    QLabel, QHBoxLayout, QCheckBox, QStyle, QStyledItemDelegate
 )
-from PyQt6.QtCore import Qt, QTimer, QSize, QObject, QThread, pyqtSignal, QPoint
-from PyQt6.QtGui import QMovie, QColor, QIcon
+from PyQt6.QtCore import Qt, QTimer, QSize, QObject, QThread, pyqtSignal, pyqtSlot, QPoint, QRunnable, QThreadPool, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QMovie, QColor, QIcon, QBrush, QPalette, QFont
 from ibkr_api import get_market_statuses_for_all, fetch_basic_positions, fetch_market_data_for_positions
 import pyqtgraph as pg
+import numpy as np
 from ib_insync import IB
 import asyncio
 from orders import process_stop_orders, get_active_stop_symbols
 from atr_processor import ATRProcessor
+import storage
+from storage import dumps, read_json, write_bytes
 
 from calculator import PortfolioCalculator
 # --- Setup Logging ---
@@ -40,6 +44,29 @@ def resource_path(relative_path):
         base_path = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_path, relative_path)
 
+# --- Cached Icons ---
+# Built lazily on first use (a QApplication must exist) and shared afterwards.
+@lru_cache(maxsize=None)
+def _std_icon(pixmap_id):
+    """Returns a cached standard style icon."""
+    return QApplication.style().standardIcon(pixmap_id)
+
+@lru_cache(maxsize=None)
+def _app_icon():
+    """Returns the cached application icon, falling back to the bundle root."""
+    icon_name = "PaceChaser.ico"
+    icon_path = resource_path(os.path.join("windows assets", icon_name))
+
+    # Fallback: Check root directory if not found in subfolder (common in frozen builds)
+    if not os.path.exists(icon_path):
+        fallback_path = resource_path(icon_name)
+        if os.path.exists(fallback_path):
+            icon_path = fallback_path
+        else:
+            logging.warning(f"Icon file not found at: {icon_path} or {fallback_path}")
+
+    return QIcon(icon_path)
+
 USER_SETTINGS_FILE = "user_settings.json"
 
 # --- Default Settings File Handling ---
@@ -57,27 +84,505 @@ ATR_STATE_FILE = 'atr_state.json'
 ATR_HISTORY_FILE = 'atr_history.json' # For graphing
 STOP_HISTORY_FILE = 'stop_history.json'
 
-class NumericTableWidgetItem(QTableWidgetItem):
+# Status column text for each order submission result status
+ORDER_STATUS_FORMATS = {
+    'submitted': "Order Updated - {timestamp}",
+    'unchanged': "Order Updated - {timestamp}",
+    'held': "Held - {message}",
+    'pending': "Order Rejected - {message}",
+    'error': "Error - {message}",
+    'skipped': "Error - {message}",
+}
+
+# --- Colors ---
+# Shared QColor instances for the positions table, rather than one per cell per refresh
+_GREEN = QColor('green')
+_ORANGE = QColor('orange')
+_RED = QColor('red')
+_LIGHT_GREEN = QColor('lightgreen')
+_DARK_GREEN_BG = QColor(0, 50, 0)
+_STATUS_GREEN = QColor(Qt.GlobalColor.green)
+_BLUE = QColor(Qt.GlobalColor.blue)
+_GRAY = QColor(Qt.GlobalColor.gray)
+# Brushes for model roles and delegate backgrounds, so Qt doesn't wrap a colour per paint
+_GREEN_BRUSH = QBrush(_GREEN)
+_ORANGE_BRUSH = QBrush(_ORANGE)
+_DARK_GREEN_BG_BRUSH = QBrush(_DARK_GREEN_BG)
+
+# --- Theme Stylesheets ---
+# Both themes are built once at import; apply_theme only picks one. The main
+# sheet is installed on the QApplication, the table overrides on the table only.
+_LIGHT_PALETTE = {
+    'bg': "#F9F9F9", # Tasteful off-white
+    'fg': "#000000",
+    'table_bg': "#FFFFFF",
+    'table_alt_bg': "#F0F0F0",
+    'input_bg': "#FFFFFF",
+    'border': "#CCCCCC",
+    'title_bg': "#E0E0E0",
+    'title_fg': "#000000",
+    'btn_hover': "#D0D0D0",
+    'tab_bg': "#E0E0E0",
+    'tab_fg': "#000000",
+    'tab_selected_bg': "#FFFFFF",
+    'tab_hover': "#EEEEEE",
+    'grid': "#CCCCCC",
+    'header_bg': "#E8E8E8",
+    'header_border': "#D0D0D0",
+    'text_bg': "#FFFFFF",
+    'text_fg': "#000000",
+    'selection_bg': "#F0F0F0",
+    'arrow': "#666666",
+    'spin_btn_bg': "#F0F0F0",
+    'spin_btn_hover': "#E0E0E0",
+    'button_bg': "#FFFFFF",
+    'button_hover': "#F0F0F0",
+    'button_hover_border': "#BBBBBB",
+    'button_pressed': "#E0E0E0",
+    'button_pressed_border': "#AAAAAA",
+    'scroll_bg': "#F0F0F0",
+    'scroll_handle': "#C0C0C0",
+    'scroll_handle_hover': "#A0A0A0",
+}
+
+_DARK_PALETTE = {
+    'bg': "#2B2B2B",
+    'fg': "#FFFFFF",
+    'table_bg': "#000000",
+    'table_alt_bg': "#111111",
+    'input_bg': "#333333",
+    'border': "#555555",
+    'title_bg': "#1e1e1e",
+    'title_fg': "#FFFFFF",
+    'btn_hover': "#333333",
+    'tab_bg': "#3C3F41",
+    'tab_fg': "#BBBBBB",
+    'tab_selected_bg': "#2B2B2B",
+    'tab_hover': "#454749",
+    'grid': "#333333",
+    'header_bg': "#333333",
+    'header_border': "#555555",
+    'text_bg': "#2B2B2B",
+    'text_fg': "#A9B7C6",
+    'selection_bg': "#454749",
+    'arrow': "#AAAAAA",
+    'spin_btn_bg': "#3C3F41",
+    'spin_btn_hover': "#4C4F51",
+    'button_bg': "#3C3F41",
+    'button_hover': "#4C4F51",
+    'button_hover_border': "#666666",
+    'button_pressed': "#2D2F31",
+    'button_pressed_border': "#444444",
+    'scroll_bg': "#2B2B2B",
+    'scroll_handle': "#555555",
+    'scroll_handle_hover': "#666666",
+}
+
+def _build_stylesheet(c):
+    """Builds the application stylesheet from a theme palette."""
+    return f"""
+        /* Base window/text colours come from the QPalette built by _build_palette() and
+           the font is set on the QApplication, so there is no universal QWidget rule. */
+
+        /* Title Bar */
+        TitleBar {{ background-color: {c['title_bg']}; border-bottom: 1px solid {c['border']}; }}
+        TitleBar QLabel {{ color: {c['title_fg']}; font-weight: bold; padding-left: 10px; border: none; background: transparent; }}
+        TitleBar QPushButton {{ background-color: transparent; border: none; color: {c['title_fg']}; font-size: 12pt; }}
+        TitleBar QPushButton:hover {{ background-color: {c['btn_hover']}; }}
+        TitleBar QPushButton#close:hover {{ background-color: #c42b1c; color: white; }}
+
+        /* Tabs */
+        QTabWidget::pane {{ border: 1px solid {c['border']}; border-radius: 4px; top: -1px; }}
+        QTabBar::tab {{ background-color: {c['tab_bg']}; color: {c['tab_fg']}; border: 1px solid {c['border']}; border-bottom: none; border-top-left-radius: 4px; border-top-right-radius: 4px; padding: 6px 12px; margin-right: 2px; }}
+        QTabBar::tab:selected {{ background-color: {c['tab_selected_bg']}; color: {c['fg']}; font-weight: bold; border-bottom: 1px solid {c['tab_selected_bg']}; }}
+        QTabBar::tab:hover {{ background-color: {c['tab_hover']}; }}
+
+        /* Table */
+        QTableView {{ background-color: {c['table_bg']}; alternate-background-color: {c['table_alt_bg']}; color: {c['fg']}; gridline-color: {c['grid']}; border: 1px solid {c['border']}; border-radius: 4px; }}
+        QHeaderView::section {{ background-color: {c['header_bg']}; color: {c['fg']}; border: 1px solid {c['header_border']}; padding: 4px; font-weight: bold; }}
+        QTableCornerButton::section {{ background-color: {c['header_bg']}; border: 1px solid {c['header_border']}; }}
+        
+        /* Inputs & Combos */
+        QPlainTextEdit {{ background-color: {c['text_bg']}; color: {c['text_fg']}; border: 1px solid {c['border']}; border-radius: 4px; padding: 4px; font-family: 'Courier New'; }}
+        QLineEdit, QComboBox, QDoubleSpinBox {{ background-color: {c['input_bg']}; color: {c['fg']}; border: 1px solid {c['border']}; border-radius: 4px; padding: 4px; }}
+        QComboBox::drop-down {{ subcontrol-origin: padding; subcontrol-position: top right; width: 20px; border-left-width: 1px; border-left-color: {c['border']}; border-left-style: solid; border-top-right-radius: 4px; border-bottom-right-radius: 4px; }}
+        QComboBox QAbstractItemView {{ background-color: {c['input_bg']}; border: 1px solid {c['border']}; selection-background-color: {c['selection_bg']}; selection-color: {c['fg']}; }}
+        QComboBox::down-arrow {{ image: none; border-left: 5px solid transparent; border-right: 5px solid transparent; border-top: 5px solid {c['arrow']}; margin-top: 2px; margin-right: 2px; }}
+        QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {{ width: 16px; border-left: 1px solid {c['border']}; background: {c['spin_btn_bg']}; }}
+        QDoubleSpinBox::up-button:hover, QDoubleSpinBox::down-button:hover {{ background: {c['spin_btn_hover']}; }}
+        
+        /* Buttons */
+        QPushButton {{ background-color: {c['button_bg']}; border: 1px solid {c['border']}; border-radius: 4px; padding: 6px 12px; min-width: 60px; color: {c['fg']}; }}
+        QPushButton:hover {{ background-color: {c['button_hover']}; border-color: {c['button_hover_border']}; }}
+        QPushButton:pressed {{ background-color: {c['button_pressed']}; border-color: {c['button_pressed_border']}; }}
+        
+        /* Scrollbars */
+        QScrollBar:vertical {{ border: none; background: {c['scroll_bg']}; width: 10px; margin: 0px; border-radius: 5px; }}
+        QScrollBar::handle:vertical {{ background: {c['scroll_handle']}; min-height: 20px; border-radius: 5px; }}
+        QScrollBar::handle:vertical:hover {{ background: {c['scroll_handle_hover']}; }}
+        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{ height: 0px; }}
+
+        /* Specific overrides */
+        #positionsTable QWidget {{ background-color: transparent; }}
     """
-    Custom TableWidgetItem to enable proper numerical sorting.
-    Stores the raw numerical value in UserRole.
+
+def _build_table_stylesheet(c):
+    """Builds the overrides for the editors embedded in the positions table."""
+    return f"""
+        QComboBox {{ margin: 2px; background-color: {c['input_bg']}; }}
+        QDoubleSpinBox {{ margin: 2px; }}
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
 
-    def __lt__(self, other):
-        try:
-            # Retrieve data from UserRole
-            val1 = self.data(Qt.ItemDataRole.UserRole)
-            val2 = other.data(Qt.ItemDataRole.UserRole)
-            
-            v1 = float(val1) if val1 is not None else -float('inf')
-            v2 = float(val2) if val2 is not None else -float('inf')
-            
-            return v1 < v2
-        except (ValueError, TypeError):
-            # Fallback to string comparison if conversion fails
-            return super().__lt__(other)
+def _build_palette(c):
+    """Builds the QPalette carrying a theme's base window, input and text colours."""
+    palette = QPalette()
+    fg = QColor(c['fg'])
+    for role, color in (
+        (QPalette.ColorRole.Window, QColor(c['bg'])),
+        (QPalette.ColorRole.WindowText, fg),
+        (QPalette.ColorRole.Base, QColor(c['input_bg'])),
+        (QPalette.ColorRole.AlternateBase, QColor(c['table_alt_bg'])),
+        (QPalette.ColorRole.Text, fg),
+        (QPalette.ColorRole.Button, QColor(c['button_bg'])),
+        (QPalette.ColorRole.ButtonText, fg),
+        (QPalette.ColorRole.ToolTipBase, QColor(c['bg'])),
+        (QPalette.ColorRole.ToolTipText, fg),
+    ):
+        palette.setColor(role, color)
+    return palette
+
+_LIGHT_QSS = _build_stylesheet(_LIGHT_PALETTE)
+_DARK_QSS = _build_stylesheet(_DARK_PALETTE)
+_LIGHT_TABLE_QSS = _build_table_stylesheet(_LIGHT_PALETTE)
+_DARK_TABLE_QSS = _build_table_stylesheet(_DARK_PALETTE)
+
+# --- Positions Table Helpers ---
+# Shared by PositionsTableModel and DataWorker, which delivers each refresh
+# already sorted in the table's current sort order.
+
+# Columns that sort numerically; the rest sort by their display text
+NUMERIC_SORT_COLUMNS = frozenset({0, 3, 4, 5, 6, 7, 8, 9, 11, 12})
+
+def position_display_text(p_data, col):
+    """Returns the display string for one positions table cell, pre-formatted by the calculator."""
+    if col == 1:
+        return p_data['position']
+    if col == 3:
+        return p_data['atr_str']
+    if col == 5:
+        return str(p_data['positions_held'])
+    if col == 6:
+        return p_data['margin_str']
+    if col == 7:
+        return p_data['avg_cost_str']
+    if col == 8:
+        return p_data['price_str']
+    if col == 9:
+        return p_data['computed_stop_str']
+    if col == 10:
+        stop_status = p_data.get('stop_status', 'new')
+        if stop_status == 'new':
+            return "New"
+        if stop_status == 'held':
+            return "Held"
+        return ""
+    if col == 11:
+        return p_data['dollar_risk_str']
+    if col == 12:
+        return p_data['percent_risk_str']
+    if col == 13:
+        return p_data.get('status', '...')
+    # Columns 0, 2 and 4 are shown by index widgets
+    return None
+
+def position_sort_value(p_data, col, stop_enabled):
+    """Returns the raw value a positions table cell sorts by."""
+    if col == 0:
+        return 1 if stop_enabled.get(p_data['symbol'], True) else 0
+    if col == 3:
+        atr_value = p_data.get('atr_value')
+        return atr_value if atr_value is not None else -1.0
+    if col == 4:
+        return p_data.get('atr_ratio', 1.5)
+    if col == 5:
+        return p_data['positions_held']
+    if col == 6:
+        return p_data.get('margin', 0)
+    if col == 7:
+        return p_data.get('avg_cost', 0.0)
+    if col == 8:
+        return p_data.get('current_price', 0)
+    if col == 9:
+        computed_stop = p_data.get('computed_stop_loss')
+        return computed_stop if computed_stop is not None else -1.0
+    if col == 11:
+        risk_value = p_data.get('dollar_risk', 0)
+        return 0 if risk_value == "NO RISK" else risk_value
+    if col == 12:
+        return p_data.get('percent_risk', 0.0)
+    return position_display_text(p_data, col) or ""
+
+def position_sort_key(column, stop_enabled):
+    """Returns a list.sort() key that orders position dicts by a positions table column."""
+    if column in NUMERIC_SORT_COLUMNS:
+        def key(p_data):
+            try:
+                value = position_sort_value(p_data, column, stop_enabled)
+                return float(value) if value is not None else -float('inf')
+            except (ValueError, TypeError):
+                return -float('inf')
+    else:
+        def key(p_data):
+            return str(position_sort_value(p_data, column, stop_enabled))
+    return key
+
+class PositionsTableModel(QAbstractTableModel):
+    """
+    Table model for the Positions tab, backed directly by the list of processed
+    position dicts from the worker. Display strings come pre-formatted from the
+    calculator and SORT_ROLE returns the raw value each column sorts by.
+    """
+    HEADERS = [
+        "Send", "Position", "Candle", "ATR", "ATR Ratio", "Positions Held", "Margin", "Avg Cost",
+        "Current Price", "Computed Stop Loss", "", "$ Risk", "% Risk", "Status"
+    ]
+    SORT_ROLE = Qt.ItemDataRole.UserRole
+    # Columns drawn from model data; 0, 2 and 4 are index widgets synced by the window
+    _TEXT_COLUMNS = (1, 3, 5, 6, 7, 8, 9, 10, 11, 12, 13)
+
+    def __init__(self, status_icons, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._stop_enabled = {}
+        self._market_statuses = {}
+        self._status_icons = status_icons
+        self.sorted_by = None # (column, order) the rows are currently sorted by, if known
+
+    def set_rows(self, rows, stop_enabled, market_statuses, sorted_by=None):
+        """
+        Swaps in a new list of position dicts. Rows are inserted/removed at the
+        end and the remaining ones are reported via dataChanged rather than a
+        model reset, so the view keeps its index widgets. Pass sorted_by when the
+        rows already arrive in a known (column, order).
+        """
+        old_rows = self._rows
+        old_statuses = self._market_statuses
+        old_count = len(old_rows)
+        new_count = len(rows)
+        self._stop_enabled = stop_enabled
+        self._market_statuses = market_statuses
+        self.sorted_by = sorted_by
+
+        # Same symbols in the same order: only repaint the cells that changed
+        if (new_count == old_count and rows is not old_rows
+                and all(old['symbol'] == new['symbol'] for old, new in zip(old_rows, rows))):
+            self._rows = rows
+            for row, (old, new) in enumerate(zip(old_rows, rows)):
+                changed = self._changed_columns(old, new, old_statuses)
+                if changed:
+                    self.dataChanged.emit(self.index(row, changed[0]), self.index(row, changed[-1]))
+            return
+
+        if new_count < old_count:
+            self.beginRemoveRows(QModelIndex(), new_count, old_count - 1)
+            self._rows = rows
+            self.endRemoveRows()
+        elif new_count > old_count:
+            self.beginInsertRows(QModelIndex(), old_count, new_count - 1)
+            self._rows = rows
+            self.endInsertRows()
+        else:
+            self._rows = rows
+
+        kept = min(old_count, new_count)
+        if kept:
+            self.dataChanged.emit(self.index(0, 0), self.index(kept - 1, len(self.HEADERS) - 1))
+
+    def _changed_columns(self, old, new, old_statuses):
+        """Returns the columns whose displayed content differs between two versions of a row."""
+        changed = [
+            col for col in self._TEXT_COLUMNS
+            if position_display_text(old, col) != position_display_text(new, col)
+        ]
+        symbol = new['symbol']
+        if 1 not in changed and old_statuses.get(symbol) != self._market_statuses.get(symbol):
+            changed.insert(0, 1) # Market status icon
+        return changed
+
+    def row_changed(self, row, first_col=0, last_col=None):
+        """Notifies the view that the given row's dict was updated."""
+        if last_col is None:
+            last_col = len(self.HEADERS) - 1
+        self.dataChanged.emit(self.index(row, first_col), self.index(row, last_col))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        p_data = self._rows[index.row()]
+        col = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display_text(p_data, col)
+        if role == self.SORT_ROLE:
+            return self._sort_key(p_data, col)
+
+        if col == 1 and role == Qt.ItemDataRole.DecorationRole:
+            # Market status indicator
+            market_status = self._market_statuses.get(p_data['symbol'], 'CLOSED')
+            return self._status_icons.get(market_status, self._status_icons['UNKNOWN'])
+        if col == 10:
+            stop_status = p_data.get('stop_status', 'new') # Default to 'new'
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return Qt.AlignmentFlag.AlignCenter
+            if role == Qt.ItemDataRole.ForegroundRole:
+                if stop_status == 'new':
+                    return _GREEN_BRUSH
+                if stop_status == 'held':
+                    return _ORANGE_BRUSH
+            if role == Qt.ItemDataRole.ToolTipRole:
+                if stop_status == 'new':
+                    return "New, higher stop loss calculated."
+                if stop_status == 'held':
+                    return "Stop loss held by ratchet (previous stop was higher)."
+        # $ Risk and % Risk colouring is applied at paint time by RiskDelegate
+        return None
+
+    def _display_text(self, p_data, col):
+        return position_display_text(p_data, col)
+
+    def _sort_key(self, p_data, col):
+        return position_sort_value(p_data, col, self._stop_enabled)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """
+        Sorts the rows in place. Persistent indexes are deliberately left at their
+        positions: the window re-syncs the row index widgets on layoutChanged.
+        """
+        if column < 0 or column >= len(self.HEADERS):
+            return
+
+        key = position_sort_key(column, self._stop_enabled)
+        self.layoutAboutToBeChanged.emit()
+        self._rows.sort(key=key, reverse=order == Qt.SortOrder.DescendingOrder)
+        self.sorted_by = (column, order)
+        self.layoutChanged.emit()
+
+class AtrTableModel(QAbstractTableModel):
+    """
+    Read-only table model for the ATR Calculations tab. Holds the symbols and
+    the (N, 3) previous ATR / TR / ATR array, formatted once per refresh.
+    """
+    HEADERS = ["Symbol", "Previous ATR", "TR (True Range)", "ATR (14)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._symbols = []
+        self._text = [] # Per row: [previous ATR, TR, ATR] display strings
+
+    def set_rows(self, symbols, atr_arr):
+        """Replaces the table contents. NaN values in atr_arr are shown as N/A."""
+        # Format all three numeric columns at once
+        text = np.where(np.isnan(atr_arr), "N/A", np.char.mod("%.2f", atr_arr)).tolist()
+        if len(symbols) == len(self._symbols):
+            self._symbols = symbols
+            self._text = text
+            if symbols:
+                self.dataChanged.emit(self.index(0, 0), self.index(len(symbols) - 1, len(self.HEADERS) - 1))
+            return
+        self.beginResetModel()
+        self._symbols = symbols
+        self._text = text
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._symbols)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row, col = index.row(), index.column()
+        if col == 0:
+            return self._symbols[row]
+        return self._text[row][col - 1]
+
+class RiskDelegate(QStyledItemDelegate):
+    """
+    Colours the $ Risk and % Risk columns at paint time from the model's sort
+    value, instead of storing brushes on every cell: "NO RISK" gets a green
+    highlight and a % risk above 2% is drawn in red.
+    """
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if index.column() == 11:
+            if index.data(Qt.ItemDataRole.DisplayRole) == "NO RISK":
+                option.backgroundBrush = _DARK_GREEN_BG_BRUSH
+                option.palette.setColor(QPalette.ColorRole.Text, _LIGHT_GREEN)
+        elif index.column() == 12:
+            percent_risk = index.data(PositionsTableModel.SORT_ROLE)
+            if percent_risk is not None and percent_risk > 2.0:
+                option.palette.setColor(QPalette.ColorRole.Text, _RED)
+
+class _JsonSaveTask(QRunnable):
+    """
+    Writes already-encoded JSON to a file on a QThreadPool thread.
+    Only the most recent data is kept: submitting while a write is pending
+    replaces the pending data instead of queueing another write.
+    If a file lock is given, it is held for the write itself.
+    """
+    def __init__(self, path, file_lock=None):
+        super().__init__()
+        self.setAutoDelete(False) # Reused for every save of this file
+        self.path = path
+        self.file_lock = file_lock
+        self._lock = threading.Lock()
+        self._pending = None
+        self._queued = False
+
+    def submit(self, data):
+        """Queues encoded bytes (from storage.dumps) for writing."""
+        with self._lock:
+            self._pending = data
+            if self._queued:
+                return
+            self._queued = True
+        QThreadPool.globalInstance().start(self)
+
+    def run(self):
+        while True:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if data is None:
+                    self._queued = False
+                    return
+            try:
+                if self.file_lock is not None:
+                    with self.file_lock:
+                        written = write_bytes(self.path, data)
+                else:
+                    written = write_bytes(self.path, data)
+                if written:
+                    logging.info(f"Saved {os.path.basename(self.path)} successfully")
+            except Exception as e:
+                logging.error(f"Error saving {os.path.basename(self.path)}: {e}")
 
 class DataWorker(QObject):
     """
@@ -92,23 +597,45 @@ class DataWorker(QObject):
     log_message = pyqtSignal(str) # Signal to send log messages to the UI
     stops_updated = pyqtSignal(dict) # Signal to send back updated stops
     
-    def __init__(self, atr_window, client_id):
+    def __init__(self, atr_window):
         super().__init__()
         # Give worker access to the main window's methods and data
         self.atr_window = atr_window
         self.highest_stop_losses = atr_window.highest_stop_losses # Use a direct reference
         self.symbol_stop_enabled = atr_window.symbol_stop_enabled
-        self.client_id = client_id # Use a consistent client ID
+        self.client_id = None # Set by run() for each cycle
+        # Positions are delivered pre-sorted in the table's current order
+        self.positions_sort = None
+        self.orders_emitted_empty = False # True once the order statuses have been cleared
+        # One IB connection and event loop, kept open across refresh cycles
+        self.ib = None
+        self._loop = None
+        self._connected_as = None # (port, client_id) of the open connection
+
+    async def _ensure_connected(self):
+        """
+        Returns the worker's IB connection, (re)connecting if it dropped or the
+        trading mode or client ID changed since it was opened.
+        """
+        # Determine port based on trading mode
+        port = 7496 if self.atr_window.trading_mode == 'LIVE' else 7497
+        target = (port, self.client_id)
+        if self.ib is not None and self.ib.isConnected():
+            if self._connected_as == target:
+                return self.ib
+            self.ib.disconnect()
+        self.ib = IB()
+        # self.log_message.emit(f"Connecting in {self.atr_window.trading_mode} mode on port {port}...")
+        await self.ib.connectAsync('127.0.0.1', port, clientId=self.client_id)
+        self._connected_as = target
+        logging.info(f"Connected to IBKR on port {port} with client ID {self.client_id}.")
+        return self.ib
 
     async def run_async(self):
         """Main worker method, executes all data stages sequentially."""
-        ib = IB()
         success = False
         try:
-            # Determine port based on trading mode
-            port = 7496 if self.atr_window.trading_mode == 'LIVE' else 7497
-            # self.log_message.emit(f"Connecting in {self.atr_window.trading_mode} mode on port {port}...")
-            await ib.connectAsync('127.0.0.1', port, clientId=self.client_id)
+            ib = await self._ensure_connected()
             
             # --- CRITICAL RECONCILIATION STEP ---
             # Before any calculations, get the ground truth of active stops from the brokerage.
@@ -116,11 +643,11 @@ class DataWorker(QObject):
             
             # Reconcile the local stop history. Remove any symbol from our ratcheting
             # history if it does NOT have an active stop order in the brokerage.
-            symbols_to_clear = set(self.highest_stop_losses.keys()) - active_stop_symbols
+            symbols_to_clear = self.highest_stop_losses.keys() - active_stop_symbols
             if symbols_to_clear:
                 # self.log_message.emit(f"Reconciliation: Clearing stale ratchet history for: {', '.join(symbols_to_clear)}")
-                for symbol in symbols_to_clear:
-                    del self.highest_stop_losses[symbol]
+                for symbol in list(symbols_to_clear):
+                    self.highest_stop_losses.pop(symbol, None)
             # --- END RECONCILIATION ---
 
             # --- Stage 1: Fetch Positions ---
@@ -159,6 +686,12 @@ class DataWorker(QObject):
                 log_callback=self.log_message.emit
             )
             final_positions_data = calculator.process_positions(enriched_positions, atr_results)            
+            if self.positions_sort is not None:
+                sort_col, sort_order = self.positions_sort
+                final_positions_data.sort(
+                    key=position_sort_key(sort_col, self.symbol_stop_enabled),
+                    reverse=sort_order == Qt.SortOrder.DescendingOrder
+                )
             self.data_ready.emit(final_positions_data, updated_atr_state, updated_atr_history)
             
             # Emit the updated stops dictionary back to the main thread
@@ -182,22 +715,51 @@ class DataWorker(QObject):
                     final_results.extend(submission_results)
                 
                 self.orders_submitted.emit(final_results)
+                self.orders_emitted_empty = not final_results
             else:
                 logging.info("Adaptive stops are DISABLED. Skipping order submission.")
-                self.orders_submitted.emit([]) # Emit empty list to clear old statuses
+                # Emit empty list to clear old statuses, but only once; repeating it
+                # every cycle just triggers another full table repopulation.
+                if not self.orders_emitted_empty:
+                    self.orders_submitted.emit([])
+                    self.orders_emitted_empty = True
             
             success = True
 
         except Exception as e:
             self.error.emit(str(e))
+            # Start the next cycle from a fresh connection rather than one in an unknown state
+            if self.ib is not None and self.ib.isConnected():
+                self.ib.disconnect()
         finally:
-            if ib.isConnected():
-                ib.disconnect()
             self.finished.emit(success)
 
-    def run(self):
-        """Synchronous entry point that runs the async run_async method."""
-        asyncio.run(self.run_async())
+    @pyqtSlot(int, object)
+    def run(self, client_id, positions_sort):
+        """
+        Synchronous entry point that runs one refresh cycle via run_async.
+        The worker lives on a persistent thread and is invoked once per cycle.
+        """
+        self.client_id = client_id # Use a consistent client ID
+        self.positions_sort = positions_sort
+        # Re-read in case the window rebound them since the last cycle
+        self.highest_stop_losses = self.atr_window.highest_stop_losses
+        self.symbol_stop_enabled = self.atr_window.symbol_stop_enabled
+        # The connection is bound to its event loop, so the loop outlives the cycle too
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self.run_async())
+
+    @pyqtSlot()
+    def shutdown(self):
+        """Closes the IB connection and event loop, then stops the worker thread."""
+        if self.ib is not None and self.ib.isConnected():
+            self.ib.disconnect()
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+        QThread.currentThread().quit()
 
     def build_stop_loss_data(self, processed_positions):
         """Prepares the data structure for submitting stop loss orders."""
@@ -361,6 +923,11 @@ class TitleBar(QWidget):
             self.toggle_maximize()
 
 class ATRWindow(QMainWindow):
+    # Starts a refresh cycle on the worker thread: (client_id, positions_sort)
+    refresh_requested = pyqtSignal(int, object)
+    # Asks the worker to disconnect from IBKR and stop its thread
+    shutdown_requested = pyqtSignal()
+
     def __init__(self):
         super().__init__()
 
@@ -374,28 +941,48 @@ class ATRWindow(QMainWindow):
 
         # Data stores
         self.positions_data = [] # This will hold the fully processed data from the worker
+        self._symbol_row_index = {} # {symbol: row in positions_data}, rebuilt by _sync_row_widgets
         self.contract_details_map = {}  # Store contract details by symbol
         self.symbol_stop_enabled = {}  # {symbol: bool} to track individual stop toggles
         self.symbol_candle_size = {} # {symbol: "1 day"|"1 hour"|"15 mins"}
         self.atr_ratios = {} # {symbol: float} to store user-set ATR ratios from the UI
 
+        # Market status indicator icons for the Position column, built once and shared by all rows
+        self._status_icons = {}
+        for status, color in (
+            ('ACTIVE (RTH)', _STATUS_GREEN),
+            ('ACTIVE (NT)', _ORANGE), # Orange for overnight/non-RTH
+            ('CLOSED', _BLUE),
+            ('UNKNOWN', _GRAY),
+        ):
+            pixmap = QtGui.QPixmap(16, 16)
+            pixmap.fill(color)
+            self._status_icons[status] = QtGui.QIcon(pixmap)
+
         # ATR calculation data
         self.atr_symbols = []
-        self.tr_values = []
-        self.atr_calculated = []
-        self.previous_atr_values = []
+        # Numeric ATR columns as one (N, 3) array: previous ATR, TR, ATR. NaN marks missing values.
+        self._atr_arr = np.empty((0, 3), dtype=np.float64)
         # State and History file paths and locks
         self.atr_state_file_lock = threading.Lock()
         self.atr_history_file_lock = threading.Lock()
         self.atr_state_file = os.path.join(USER_DATA_DIR, ATR_STATE_FILE)
         self.atr_history_file = os.path.join(USER_DATA_DIR, ATR_HISTORY_FILE)
+        self._atr_state_save_task = _JsonSaveTask(self.atr_state_file, self.atr_state_file_lock)
+        self._atr_history_save_task = _JsonSaveTask(self.atr_history_file, self.atr_history_file_lock)
         
         self.atr_state = self.load_atr_state()
         self.atr_history = self.load_atr_history()
 
         # Load persistent stop loss history
         self.stop_history_file = os.path.join(USER_DATA_DIR, STOP_HISTORY_FILE)
+        self._stop_history_save_task = _JsonSaveTask(self.stop_history_file)
         self.highest_stop_losses = self.load_stop_history() # This is now loaded from a file
+        self._saved_stops = dict(self.highest_stop_losses) # What's on disk, for skipping no-op saves
+        # Coalesces stop updates from consecutive refresh cycles into one write
+        self._stops_save_timer = QTimer(self)
+        self._stops_save_timer.setSingleShot(True)
+        self._stops_save_timer.timeout.connect(self.save_stop_history)
 
         # --- New: User Settings File and Loading ---
         # Set a default client_id before loading settings
@@ -404,6 +991,7 @@ class ATRWindow(QMainWindow):
         self.debug_log_enabled = True # Default debug log
         self.debug_full_log_enabled = False # Default full log
         self.theme = "Dark" # Default theme
+        self._applied_theme = None # Theme whose stylesheet is currently installed
 
         # Setup Log Bridge for Full Log
         self.log_bridge = LogBridge()
@@ -412,6 +1000,11 @@ class ATRWindow(QMainWindow):
         self.qt_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 
         self.user_settings_file = os.path.join(USER_DATA_DIR, USER_SETTINGS_FILE)
+        # Coalesces bursts of save_user_settings() calls into a single write
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self._do_save_user_settings)
+        self._settings_save_task = _JsonSaveTask(self.user_settings_file)
         # Load settings, which will update client_id if it exists in the file
         self.load_user_settings()
         self.update_full_log_state()
@@ -420,8 +1013,22 @@ class ATRWindow(QMainWindow):
         self.send_adaptive_stops = False
         self.market_statuses = {}  # {symbol: 'ACTIVE (RTH)' | 'ACTIVE (NT)' | 'CLOSED'}
 
-        # Threading
+        # Calculator reused for ATR ratio previews; its state references are
+        # refreshed before each use since the window rebinds them on every cycle.
+        self._calc = PortfolioCalculator(
+            self.atr_state, {}, self.highest_stop_losses, self.atr_ratios, self.market_statuses
+        )
+        # Coalesces rapid ATR ratio spin box changes into one recalculation per symbol
+        self._pending_ratio_symbols = set()
+        self._ratio_timer = QTimer(self)
+        self._ratio_timer.setSingleShot(True)
+        self._ratio_timer.timeout.connect(self._flush_ratio_changes)
+
+        # Threading: one worker on one thread, created on the first refresh and reused
         self.worker_thread = None
+        self.worker = None
+        self._refresh_running = False
+        self._refresh_pending = False # A refresh was requested while one was running
 
         # Central widget & layout
         main_container = QWidget()
@@ -517,7 +1124,7 @@ class ATRWindow(QMainWindow):
         # --- Settings Button ---
         self.settings_button = QPushButton()
         # Use a standard icon that looks like a gear/settings
-        settings_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView)
+        settings_icon = _std_icon(QStyle.StandardPixmap.SP_FileDialogDetailedView)
         self.settings_button.setIcon(settings_icon)
         self.settings_button.clicked.connect(self.open_settings_window)
         status_layout.addWidget(self.settings_button)
@@ -532,8 +1139,9 @@ class ATRWindow(QMainWindow):
         self.log_label = QLabel("Log Output:")
         self.log_label.setStyleSheet("font-weight: bold; margin-top: 10px;")
         layout.addWidget(self.log_label)
-        self.log_view = QTextEdit()
+        self.log_view = QPlainTextEdit()
         self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(5000) # Drop the oldest lines rather than grow forever
         # Stylesheet is now handled by apply_theme()
         self.log_view.setMaximumHeight(200) # Give it a fixed max height
         layout.addWidget(self.log_view)
@@ -547,14 +1155,17 @@ class ATRWindow(QMainWindow):
         self.positions_tab.setLayout(self.positions_layout)
         self.tabs.addTab(self.positions_tab, "Positions")
 
-        self.table = QTableWidget()
+        self.positions_model = PositionsTableModel(self._status_icons, self)
+        # Sorting reorders the model rows; re-point the row widgets afterwards
+        self.positions_model.layoutChanged.connect(self._sync_row_widgets)
+        self.table = QTableView()
+        self.table.setObjectName("positionsTable") # Scopes the index widget rule in the stylesheet
+        self.table.setModel(self.positions_model)
+        self.risk_delegate = RiskDelegate(self.table)
+        self.table.setItemDelegateForColumn(11, self.risk_delegate)
+        self.table.setItemDelegateForColumn(12, self.risk_delegate)
         self.table.setAlternatingRowColors(True)
         # Stylesheet is now handled by apply_theme()
-        self.table.setColumnCount(14)
-        self.table.setHorizontalHeaderLabels([
-            "Send", "Position", "Candle", "ATR", "ATR Ratio", "Positions Held", "Margin", "Avg Cost",
-            "Current Price", "Computed Stop Loss", "", "$ Risk", "% Risk", "Status"
-        ])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         self.table.horizontalHeader().setSectionResizeMode(13, QHeaderView.ResizeMode.Stretch)
         self.table.horizontalHeader().setSectionsMovable(True)
@@ -572,6 +1183,9 @@ class ATRWindow(QMainWindow):
             self.table.setColumnWidth(10, 50) # Ratchet status column
             
         self.table.setSortingEnabled(True)
+        # Connected after enabling sorting, so only real user sorts are recorded
+        self._user_sort = None # (column, order) once the user has sorted the table
+        self.table.horizontalHeader().sortIndicatorChanged.connect(self._on_sort_changed)
         self.positions_layout.addWidget(self.table)
 
         # --- ATR Calculations Tab ---
@@ -580,11 +1194,9 @@ class ATRWindow(QMainWindow):
         self.atr_calc_tab.setLayout(self.atr_calc_layout)
         self.tabs.addTab(self.atr_calc_tab, "ATR Calculations")
 
-        self.atr_table = QTableWidget()
-        self.atr_table.setColumnCount(4)
-        self.atr_table.setHorizontalHeaderLabels([
-            "Symbol", "Previous ATR", "TR (True Range)", "ATR (14)"
-        ])
+        self.atr_model = AtrTableModel(self)
+        self.atr_table = QTableView()
+        self.atr_table.setModel(self.atr_model)
         self.atr_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.atr_table.verticalHeader().setDefaultSectionSize(60)  # Increase row height for multi-line text
         self.atr_calc_layout.addWidget(self.atr_table)
@@ -610,7 +1222,7 @@ class ATRWindow(QMainWindow):
         # Add a button to reset the graph view to the most recent data
         self.reset_view_button = QPushButton()
         # Use a "reset" icon, as a standard crosshair is not available.
-        reset_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_DialogResetButton)
+        reset_icon = _std_icon(QStyle.StandardPixmap.SP_DialogResetButton)
         self.reset_view_button.setIcon(reset_icon)
         self.reset_view_button.setToolTip("Reset view to show the most recent data")
         self.reset_view_button.setFixedSize(28, 28)
@@ -624,6 +1236,16 @@ class ATRWindow(QMainWindow):
         self.atr_plot = pg.PlotWidget()
         self.graphing_layout.addWidget(self.atr_plot)
 
+        # Persistent axis and curve, reused by update_atr_graph via setData()
+        # instead of clearing and re-creating plot items on every redraw.
+        self._date_axis = pg.DateAxisItem()
+        self._date_axis.setStyle(tickTextOffset=10, autoExpandTextSpace=True)
+        self.atr_plot.plotItem.setAxisItems({'bottom': self._date_axis})
+        self.atr_plot.setLabel('left', 'ATR Value')
+        self.atr_plot.setLabel('bottom', 'Time')
+        self.atr_plot.showGrid(x=True, y=True)
+        self._atr_curve = self.atr_plot.plot([], [], symbol='o', symbolSize=5)
+
         # Setup auto-refresh timer (60 seconds = 60000 ms)
         self.refresh_timer = QTimer(self)
         self.refresh_timer.timeout.connect(self.start_full_refresh)
@@ -658,28 +1280,24 @@ class ATRWindow(QMainWindow):
     def update_atr_graph(self):
         """Updates the ATR graph based on the selected symbol."""
         symbol = self.symbol_selector.currentText()
-        self.atr_plot.clear()
-        
+
         # Reset ViewBox limits to defaults to prevent carry-over between symbols
         view_box = self.atr_plot.plotItem.getViewBox()
         view_box.setLimits(xMin=None, xMax=None, yMin=None, yMax=None,
                            minXRange=None, maxXRange=None, minYRange=None, maxYRange=None)
 
         if not symbol or symbol not in self.atr_history:
+            self._atr_curve.setData([], [])
             self.atr_plot.setTitle(f"ATR History for {symbol}")
             return
 
-        # Get the candle size setting for this symbol to plot the correct data
-        candle_size = self.get_candle_size(symbol)
+        # Get the candle size setting for this symbol to plot the correct data.
+        # Read the settings dict directly; this runs on every tab switch and redraw.
+        candle_size = self.symbol_candle_size.get(symbol, "1 day")
         self.atr_plot.setTitle(f"ATR History for {symbol} ({candle_size})")
-        self.atr_plot.setLabel('left', 'ATR Value')
-        self.atr_plot.setLabel('bottom', 'Time')
-        self.atr_plot.showGrid(x=True, y=True)
 
         # The data is now nested: symbol -> candle_size -> {timestamp: atr}
-        symbol_candle_data = self.atr_history.get(symbol, {}).get(candle_size, {})
-        if not symbol_candle_data:
-            return
+        symbol_candle_data = self.atr_history[symbol].get(candle_size, {})
 
         # Sort data by timestamp and prepare for plotting
         valid_timestamps = [ts for ts in symbol_candle_data.keys() if 'T' in ts]
@@ -687,6 +1305,9 @@ class ATRWindow(QMainWindow):
         x_data = [datetime.fromisoformat(ts).timestamp() for ts in sorted_timestamps]
         y_data = [symbol_candle_data[ts] for ts in sorted_timestamps]
 
+        pen_color = getattr(self, 'plot_pen', 'y')
+        self._atr_curve.setData(x_data, y_data, pen=pg.mkPen(pen_color, width=2), symbolBrush=pen_color)
+
         if not y_data:
             return
 
@@ -717,25 +1338,18 @@ class ATRWindow(QMainWindow):
                 half_span = max_x_span / 2
                 view_box.setXRange(last_ts - half_span, last_ts + half_span, padding=0)
 
-        # Create and configure the DateAxisItem for the bottom axis
-        axis = pg.DateAxisItem()
-        axis.setStyle(tickTextOffset=10, autoExpandTextSpace=True)
-
         # Set tick spacing based on the candle size for clarity
         if candle_size == "1 day":
             # 3M view: Major ticks per week, minor per day
-            axis.setTickSpacing(86400 * 7, 86400)
+            self._date_axis.setTickSpacing(86400 * 7, 86400)
         elif candle_size == "1 hour":
             # 1W view: Major ticks per day, minor per 6 hours
-            axis.setTickSpacing(86400, 3600 * 6)
+            self._date_axis.setTickSpacing(86400, 3600 * 6)
         elif candle_size == "15 mins":
             # 2D view: Major ticks per 4 hours, minor per hour
-            axis.setTickSpacing(3600 * 4, 3600)
-
-        self.atr_plot.plotItem.setAxisItems({'bottom': axis})
-        
-        pen_color = getattr(self, 'plot_pen', 'y')
-        self.atr_plot.plot(x_data, y_data, pen=pg.mkPen(pen_color, width=2), symbol='o', symbolBrush=pen_color, symbolSize=5)
+            self._date_axis.setTickSpacing(3600 * 4, 3600)
+        else:
+            self._date_axis.setTickSpacing()
 
     def update_log_visibility(self):
         """Updates the visibility of the log view based on the setting."""
@@ -782,7 +1396,7 @@ class ATRWindow(QMainWindow):
                 pass
     def log_to_ui(self, message):
         """Appends a message to the log view and auto-scrolls to the bottom."""
-        self.log_view.append(message)
+        self.log_view.appendPlainText(message)
         # Ensure the view scrolls to the latest message
         self.log_view.verticalScrollBar().setValue(self.log_view.verticalScrollBar().maximum())    
 
@@ -797,135 +1411,28 @@ class ATRWindow(QMainWindow):
     
     def apply_theme(self):
         """Applies the selected theme (Light/Dark) to the application."""
+        # Re-applying the same stylesheet would still re-polish every widget
+        if self._applied_theme == self.theme:
+            return
+
         if self.theme == "Light":
-            # Light Theme
-            bg_color = "#F9F9F9" # Tasteful off-white
-            fg_color = "#000000"
-            table_bg = "#FFFFFF"
-            table_alt_bg = "#F0F0F0"
-            input_bg = "#FFFFFF"
-            border_color = "#CCCCCC"
             self.plot_pen = 'b' # Blue for light theme
-            
-            title_bg = "#E0E0E0"
-            title_fg = "#000000"
-            btn_hover = "#D0D0D0"
-            
             self.atr_plot.setBackground('w')
             self.atr_plot.getAxis('bottom').setPen('k')
             self.atr_plot.getAxis('left').setPen('k')
-
-            stylesheet = f"""
-                QMainWindow, QWidget {{ background-color: {bg_color}; color: {fg_color}; font-family: "Segoe UI", "Helvetica Neue", Helvetica, Arial, sans-serif; font-size: 10pt; }}
-                
-                /* Title Bar */
-                TitleBar {{ background-color: {title_bg}; border-bottom: 1px solid {border_color}; }}
-                TitleBar QLabel {{ color: {title_fg}; font-weight: bold; padding-left: 10px; border: none; background: transparent; }}
-                TitleBar QPushButton {{ background-color: transparent; border: none; color: {title_fg}; font-size: 12pt; }}
-                TitleBar QPushButton:hover {{ background-color: {btn_hover}; }}
-                TitleBar QPushButton#close:hover {{ background-color: #c42b1c; color: white; }}
-
-                /* Tabs */
-                QTabWidget::pane {{ border: 1px solid {border_color}; border-radius: 4px; top: -1px; }} 
-                QTabBar::tab {{ background-color: #E0E0E0; color: {fg_color}; border: 1px solid {border_color}; border-bottom: none; border-top-left-radius: 4px; border-top-right-radius: 4px; padding: 6px 12px; margin-right: 2px; }}
-                QTabBar::tab:selected {{ background-color: {table_bg}; font-weight: bold; border-bottom: 1px solid {table_bg}; }}
-                QTabBar::tab:hover {{ background-color: #EEEEEE; }}
-
-                /* Table */
-                QTableWidget {{ background-color: {table_bg}; alternate-background-color: {table_alt_bg}; color: {fg_color}; gridline-color: {border_color}; border: 1px solid {border_color}; border-radius: 4px; }}
-                QHeaderView::section {{ background-color: #E8E8E8; color: {fg_color}; border: 1px solid #D0D0D0; padding: 4px; font-weight: bold; }}
-                QTableCornerButton::section {{ background-color: #E8E8E8; border: 1px solid #D0D0D0; }}
-                
-                /* Inputs & Combos */
-                QTextEdit {{ background-color: {input_bg}; color: {fg_color}; border: 1px solid {border_color}; border-radius: 4px; padding: 4px; font-family: 'Courier New'; }}
-                QLineEdit, QComboBox, QDoubleSpinBox {{ background-color: {input_bg}; color: {fg_color}; border: 1px solid {border_color}; border-radius: 4px; padding: 4px; }}
-                QComboBox::drop-down {{ subcontrol-origin: padding; subcontrol-position: top right; width: 20px; border-left-width: 1px; border-left-color: {border_color}; border-left-style: solid; border-top-right-radius: 4px; border-bottom-right-radius: 4px; }}
-                QComboBox QAbstractItemView {{ background-color: {input_bg}; border: 1px solid {border_color}; selection-background-color: {table_alt_bg}; selection-color: {fg_color}; }}
-                QComboBox::down-arrow {{ image: none; border-left: 5px solid transparent; border-right: 5px solid transparent; border-top: 5px solid #666666; margin-top: 2px; margin-right: 2px; }}
-                QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {{ width: 16px; border-left: 1px solid {border_color}; background: #F0F0F0; }}
-                QDoubleSpinBox::up-button:hover, QDoubleSpinBox::down-button:hover {{ background: #E0E0E0; }}
-                
-                /* Buttons */
-                QPushButton {{ background-color: #FFFFFF; border: 1px solid {border_color}; border-radius: 4px; padding: 6px 12px; min-width: 60px; }}
-                QPushButton:hover {{ background-color: #F0F0F0; border-color: #BBBBBB; }}
-                QPushButton:pressed {{ background-color: #E0E0E0; border-color: #AAAAAA; }}
-                
-                /* Scrollbars */
-                QScrollBar:vertical {{ border: none; background: #F0F0F0; width: 10px; margin: 0px; border-radius: 5px; }}
-                QScrollBar::handle:vertical {{ background: #C0C0C0; min-height: 20px; border-radius: 5px; }}
-                QScrollBar::handle:vertical:hover {{ background: #A0A0A0; }}
-                QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{ height: 0px; }}
-
-                /* Specific overrides */
-                QTableWidget QWidget {{ background-color: transparent; }}
-                QTableWidget QComboBox {{ margin: 2px; background-color: {input_bg}; }}
-                QTableWidget QDoubleSpinBox {{ margin: 2px; }}
-            """
+            theme_palette, app_qss, table_qss = _LIGHT_PALETTE, _LIGHT_QSS, _LIGHT_TABLE_QSS
         else:
-            # Dark Theme
-            bg_color = "#2B2B2B"
-            fg_color = "#FFFFFF"
-            table_bg = "#000000"
-            table_alt_bg = "#111111"
-            input_bg = "#333333"
-            border_color = "#555555"
             self.plot_pen = 'y' # Yellow for dark theme
-            
-            title_bg = "#1e1e1e"
-            title_fg = "#FFFFFF"
-            btn_hover = "#333333"
-
             self.atr_plot.setBackground('k')
             self.atr_plot.getAxis('bottom').setPen('#A9B7C6')
             self.atr_plot.getAxis('left').setPen('#A9B7C6')
+            theme_palette, app_qss, table_qss = _DARK_PALETTE, _DARK_QSS, _DARK_TABLE_QSS
 
-            stylesheet = f"""
-                QMainWindow, QWidget {{ background-color: {bg_color}; color: {fg_color}; font-family: "Segoe UI", "Helvetica Neue", Helvetica, Arial, sans-serif; font-size: 10pt; }}
-                
-                /* Title Bar */
-                TitleBar {{ background-color: {title_bg}; border-bottom: 1px solid {border_color}; }}
-                TitleBar QLabel {{ color: {title_fg}; font-weight: bold; padding-left: 10px; border: none; background: transparent; }}
-                TitleBar QPushButton {{ background-color: transparent; border: none; color: {title_fg}; font-size: 12pt; }}
-                TitleBar QPushButton:hover {{ background-color: {btn_hover}; }}
-                TitleBar QPushButton#close:hover {{ background-color: #c42b1c; color: white; }}
-
-                /* Tabs */
-                QTabWidget::pane {{ border: 1px solid {border_color}; border-radius: 4px; top: -1px; }}
-                QTabBar::tab {{ background-color: #3C3F41; color: #BBBBBB; border: 1px solid {border_color}; border-bottom: none; border-top-left-radius: 4px; border-top-right-radius: 4px; padding: 6px 12px; margin-right: 2px; }}
-                QTabBar::tab:selected {{ background-color: {bg_color}; color: {fg_color}; font-weight: bold; border-bottom: 1px solid {bg_color}; }}
-                QTabBar::tab:hover {{ background-color: #454749; }}
-
-                /* Table */
-                QTableWidget {{ background-color: {table_bg}; alternate-background-color: {table_alt_bg}; color: {fg_color}; gridline-color: #333333; border: 1px solid {border_color}; border-radius: 4px; }}
-                QHeaderView::section {{ background-color: #333333; color: {fg_color}; border: 1px solid {border_color}; padding: 4px; font-weight: bold; }}
-                QTableCornerButton::section {{ background-color: #333333; border: 1px solid {border_color}; }}
-                
-                /* Inputs & Combos */
-                QTextEdit {{ background-color: {bg_color}; color: #A9B7C6; border: 1px solid {border_color}; border-radius: 4px; padding: 4px; font-family: 'Courier New'; }}
-                QLineEdit, QComboBox, QDoubleSpinBox {{ background-color: {input_bg}; color: {fg_color}; border: 1px solid {border_color}; border-radius: 4px; padding: 4px; }}
-                QComboBox::drop-down {{ subcontrol-origin: padding; subcontrol-position: top right; width: 20px; border-left-width: 1px; border-left-color: {border_color}; border-left-style: solid; border-top-right-radius: 4px; border-bottom-right-radius: 4px; }}
-                QComboBox QAbstractItemView {{ background-color: {input_bg}; border: 1px solid {border_color}; selection-background-color: #454749; selection-color: {fg_color}; }}
-                QComboBox::down-arrow {{ image: none; border-left: 5px solid transparent; border-right: 5px solid transparent; border-top: 5px solid #AAAAAA; margin-top: 2px; margin-right: 2px; }}
-                QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {{ width: 16px; border-left: 1px solid {border_color}; background: #3C3F41; }}
-                QDoubleSpinBox::up-button:hover, QDoubleSpinBox::down-button:hover {{ background: #4C4F51; }}
-                
-                /* Buttons */
-                QPushButton {{ background-color: #3C3F41; border: 1px solid {border_color}; border-radius: 4px; padding: 6px 12px; min-width: 60px; color: {fg_color}; }}
-                QPushButton:hover {{ background-color: #4C4F51; border-color: #666666; }}
-                QPushButton:pressed {{ background-color: #2D2F31; border-color: #444444; }}
-                
-                /* Scrollbars */
-                QScrollBar:vertical {{ border: none; background: {bg_color}; width: 10px; margin: 0px; border-radius: 5px; }}
-                QScrollBar::handle:vertical {{ background: #555555; min-height: 20px; border-radius: 5px; }}
-                QScrollBar::handle:vertical:hover {{ background: #666666; }}
-                QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{ height: 0px; }}
-
-                /* Specific overrides */
-                QTableWidget QWidget {{ background-color: transparent; }}
-                QTableWidget QComboBox {{ margin: 2px; background-color: {input_bg}; }}
-                QTableWidget QDoubleSpinBox {{ margin: 2px; }}
-            """
-        self.setStyleSheet(stylesheet)
+        app = QApplication.instance()
+        app.setPalette(_build_palette(theme_palette))
+        app.setStyleSheet(app_qss)
+        self.table.setStyleSheet(table_qss)
+        self._applied_theme = self.theme
         
         if self.symbol_selector.currentText():
             self.update_atr_graph()
@@ -937,186 +1444,154 @@ class ATRWindow(QMainWindow):
         """
         logging.info("Close event triggered. Attempting to stop worker thread...")
         if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.quit()
+            # Queued behind any cycle in progress; the worker quits its own thread
+            self.shutdown_requested.emit()
             if not self.worker_thread.wait(5000):
                 logging.warning("Worker thread did not terminate gracefully. Forcing termination.")
                 self.worker_thread.terminate()
 
-        self.save_user_settings() # Save checkbox states on exit
-        self.save_stop_history() # Save stop history on exit
+        self._save_timer.stop()
+        self._stops_save_timer.stop()
+        if self.highest_stop_losses != self._saved_stops:
+            self.save_stop_history() # Save stop history on exit if it changed
+        # Save checkbox states on exit, bypassing the debounce. Waiting also
+        # flushes every other pending background save, including the one above.
+        self._do_save_user_settings(wait=True)
         event.accept() # Proceed with closing the window
 
-    def populate_positions_table(self):
-        """Populates the main table with fully processed data. No calculations here."""
+    def _on_sort_changed(self, column, order):
+        """Remembers the sort the user picked from the positions table header."""
+        self._user_sort = (column, order) if column != -1 else None
+
+    def current_positions_sort(self):
+        """
+        Returns the positions table's (column, order) sort, or None if the user
+        hasn't sorted it. The header's own indicator can't be used for this, as it
+        reports column 0 even before any sort on some platforms.
+        """
+        return self._user_sort
+
+    def populate_positions_table(self, sorted_by=None):
+        """
+        Pushes the fully processed data into the positions model. No calculations here.
+        sorted_by is the (column, order) positions_data is already sorted by, if any.
+        """
+        header = self.table.horizontalHeader()
+        viewport = self.table.viewport()
+
         # Save current sort state to restore after repopulating
-        current_sort_col = self.table.horizontalHeader().sortIndicatorSection()
-        current_sort_order = self.table.horizontalHeader().sortIndicatorOrder()
-        
-        # Disable sorting during population to improve performance and prevent auto-sorting artifacts
-        self.table.setSortingEnabled(False)
+        current_sort = self.current_positions_sort()
         
-        self.table.setRowCount(len(self.positions_data))
+        # Batch the whole repopulation into a single layout and paint pass: no
+        # repaints, signals or section resizing while rows change.
+        self.table.setUpdatesEnabled(False)
+        viewport.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        try:
+            self.positions_model.set_rows(self.positions_data, self.symbol_stop_enabled, self.market_statuses, sorted_by)
+            # Restore previous sort if it existed. The worker normally delivers rows
+            # in this order already, in which case only the widgets need syncing.
+            if current_sort is not None and current_sort != self.positions_model.sorted_by:
+                try:
+                    self.positions_model.sort(*current_sort) # Also re-syncs the row widgets
+                except Exception as e:
+                    logging.error(f"Error sorting table: {e}")
+                    self._sync_row_widgets()
+            else:
+                self._sync_row_widgets()
+        finally:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+            header.setSectionResizeMode(13, QHeaderView.ResizeMode.Stretch)
+            self.table.blockSignals(False)
+            viewport.setUpdatesEnabled(True)
+            self.table.setUpdatesEnabled(True)
+            viewport.update()
+
+    def _sync_row_widgets(self):
+        """
+        Creates or updates the checkbox, candle combo and ATR ratio spin box for
+        every row so they match the model row they currently sit on.
+        """
+        # Bind hot lookups to locals once rather than resolving them per row/cell
+        get_enabled = self.symbol_stop_enabled.get
+        get_candle = self.symbol_candle_size.get
+        model_index = self.positions_model.index
+        index_widget = self.table.indexWidget
+        set_index_widget = self.table.setIndexWidget
+        candle_options = ["15 mins", "1 hour", "1 day"]
+        row_index = {}
+
         for i, p_data in enumerate(self.positions_data):
             try:
                 symbol = p_data['symbol']
-                
+                row_index[symbol] = i
+
+                # Cell widgets are created once per row and reused on later refreshes.
+                # They all share one dispatcher slot per column, which reads the row's
+                # current symbol from the sending widget's "symbol" property.
+
                 # Column 0: "Send Stop" Checkbox
-                # Add a hidden item for sorting based on enabled state
-                is_enabled = self.symbol_stop_enabled.get(symbol, True)
-                item_0 = NumericTableWidgetItem()
-                item_0.setData(Qt.ItemDataRole.UserRole, 1 if is_enabled else 0)
-                self.table.setItem(i, 0, item_0)
-
-                checkbox_widget = QWidget()
-                checkbox_layout = QHBoxLayout(checkbox_widget)
-                checkbox = QCheckBox()
-                checkbox.setChecked(self.symbol_stop_enabled.get(symbol, True))
-                checkbox.stateChanged.connect(lambda state, s=symbol: self.on_symbol_toggle_changed(s, state))
-                checkbox_layout.addWidget(checkbox)
-                checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                checkbox_layout.setContentsMargins(0,0,0,0)
-                self.table.setCellWidget(i, 0, checkbox_widget)
-
-                # Column 1: Position with new status indicator
-                market_status = self.market_statuses.get(symbol, 'CLOSED')
-                position_item = QTableWidgetItem(p_data['position'])
-
-                # Create a colored circle icon
-                pixmap = QtGui.QPixmap(16, 16)
-                if market_status == 'ACTIVE (RTH)':
-                    pixmap.fill(Qt.GlobalColor.green)
-                elif market_status == 'ACTIVE (NT)':
-                    pixmap.fill(QColor('orange')) # Orange for overnight/non-RTH
-                elif market_status == 'CLOSED':
-                    pixmap.fill(Qt.GlobalColor.blue)
-                else:  # UNKNOWN or other
-                    pixmap.fill(Qt.GlobalColor.gray)
-                
-                icon = QtGui.QIcon(pixmap)
-                position_item.setIcon(icon)
-                self.table.setItem(i, 1, position_item)
-                
+                is_enabled = get_enabled(symbol, True)
+                checkbox_index = model_index(i, 0)
+                checkbox_widget = index_widget(checkbox_index)
+                if checkbox_widget is None:
+                    checkbox_widget = QWidget()
+                    checkbox_layout = QHBoxLayout(checkbox_widget)
+                    checkbox = QCheckBox()
+                    checkbox.stateChanged.connect(self._on_any_symbol_toggle_changed)
+                    checkbox_layout.addWidget(checkbox)
+                    checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                    checkbox_layout.setContentsMargins(0,0,0,0)
+                    set_index_widget(checkbox_index, checkbox_widget)
+                else:
+                    checkbox = checkbox_widget.findChild(QCheckBox)
+                checkbox.setProperty("symbol", symbol)
+                checkbox.blockSignals(True)
+                checkbox.setChecked(is_enabled)
+                checkbox.blockSignals(False)
+
                 # Column 2: Candle Size
-                candle_options = ["15 mins", "1 hour", "1 day"]
-                current_candle = self.get_candle_size(symbol)
-                
-                combo = QComboBox()
-                combo.addItems(candle_options)
+                combo_index = model_index(i, 2)
+                combo = index_widget(combo_index)
+                if combo is None:
+                    combo = QComboBox()
+                    combo.addItems(candle_options)
+                    combo.currentTextChanged.connect(self._on_any_candle_size_changed)
+                    set_index_widget(combo_index, combo)
+                combo.setProperty("symbol", symbol)
                 combo.blockSignals(True)
-                combo.setCurrentText(current_candle)
+                combo.setCurrentText(get_candle(symbol, "1 day"))
                 combo.blockSignals(False)
-                combo.currentTextChanged.connect(lambda text, s=symbol: self.on_candle_size_changed(s, text))
-                self.table.setCellWidget(i, 2, combo)
-
-                # Column 3: ATR - Get ATR value from ATR calculations tab
-                atr_value = p_data.get('atr_value')
-                atr_display = f"{atr_value:.4f}" if atr_value is not None else "N/A"
-                item_2 = NumericTableWidgetItem(atr_display)
-                item_2.setData(Qt.ItemDataRole.UserRole, atr_value if atr_value is not None else -1.0)
-                self.table.setItem(i, 3, item_2)
 
                 # Column 4: ATR Ratio editable spin box
-                ratio_val = p_data.get('atr_ratio', 1.5)
-                item_3 = NumericTableWidgetItem()
-                item_3.setData(Qt.ItemDataRole.UserRole, ratio_val)
-                self.table.setItem(i, 4, item_3)
-
-                spin = QDoubleSpinBox()
-                spin.setMinimum(0.1)
-                spin.setMaximum(10.0)
-                spin.setSingleStep(0.1)
-                spin.setDecimals(1)
-                spin.setValue(ratio_val)
-                spin.setButtonSymbols(QAbstractSpinBox.ButtonSymbols.NoButtons)
-                spin.valueChanged.connect(lambda val, row=i, symbol=symbol: self.on_atr_ratio_changed(row, symbol, val))
-                self.table.setCellWidget(i, 4, spin)
-
-                # Column 5: Positions Held
-                pos_held = p_data['positions_held']
-                item_4 = NumericTableWidgetItem(str(pos_held))
-                item_4.setData(Qt.ItemDataRole.UserRole, pos_held)
-                self.table.setItem(i, 5, item_4)
-                
-                # Column 6: Margin
-                margin = p_data.get('margin', 0)
-                item_5 = NumericTableWidgetItem(f"${margin:,.2f}")
-                item_5.setData(Qt.ItemDataRole.UserRole, margin)
-                self.table.setItem(i, 6, item_5)
-
-                # Column 7: Avg Cost
-                avg_cost = p_data.get('avg_cost', 0.0)
-                item_6 = NumericTableWidgetItem(f"{avg_cost:,.2f}")
-                item_6.setData(Qt.ItemDataRole.UserRole, avg_cost)
-                self.table.setItem(i, 7, item_6)
-
-                # Column 8: Current Price
-                price = p_data.get('current_price', 0)
-                item_7 = NumericTableWidgetItem(f"{price:.2f}")
-                item_7.setData(Qt.ItemDataRole.UserRole, price)
-                self.table.setItem(i, 8, item_7)
-
-                # Column 9: Computed Stop Loss
-                computed_stop = p_data.get('computed_stop_loss')
-                stop_display = f"{computed_stop:.4f}" if computed_stop is not None else "N/A"
-                item_8 = NumericTableWidgetItem(stop_display)
-                item_8.setData(Qt.ItemDataRole.UserRole, computed_stop if computed_stop is not None else -1.0)
-                self.table.setItem(i, 9, item_8)
-
-                # Column 10: Stop Status Icon (New)
-                stop_status = p_data.get('stop_status', 'new') # Default to 'new'
-                status_item = QTableWidgetItem()
-                status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                if stop_status == 'new':
-                    status_item.setText("New")
-                    status_item.setForeground(QColor('green'))
-                    status_item.setToolTip("New, higher stop loss calculated.")
-                elif stop_status == 'held':
-                    status_item.setText("Held")
-                    status_item.setForeground(QColor('orange'))
-                    status_item.setToolTip("Stop loss held by ratchet (previous stop was higher).")
-
-                self.table.setItem(i, 10, status_item)
-
-                # Column 11: $ Risk
-                risk_value = p_data.get('dollar_risk', 0)
-                if risk_value == "NO RISK":
-                    item_10 = NumericTableWidgetItem("NO RISK")
-                    item_10.setData(Qt.ItemDataRole.UserRole, 0)
-                    item_10.setBackground(QColor(0, 50, 0))
-                    item_10.setForeground(QColor('lightgreen'))
-                else:
-                    item_10 = NumericTableWidgetItem(f"${risk_value:,.2f}")
-                    item_10.setData(Qt.ItemDataRole.UserRole, risk_value)
-                
-                self.table.setItem(i, 11, item_10)
-
-                # Column 12: % Risk
-                percent_risk = p_data.get('percent_risk', 0.0)
-                item_11 = NumericTableWidgetItem(f"{percent_risk:.2f}%")
-                item_11.setData(Qt.ItemDataRole.UserRole, percent_risk)
-
-                if percent_risk > 2.0:
-                    item_11.setForeground(QColor('red'))
-                self.table.setItem(i, 12, item_11)
-
-                # Column 13: Status
-                self.table.setItem(i, 13, QTableWidgetItem(p_data.get('status', '...')))
+                spin_index = model_index(i, 4)
+                spin = index_widget(spin_index)
+                if spin is None:
+                    spin = QDoubleSpinBox()
+                    spin.setMinimum(0.1)
+                    spin.setMaximum(10.0)
+                    spin.setSingleStep(0.1)
+                    spin.setDecimals(1)
+                    spin.setButtonSymbols(QAbstractSpinBox.ButtonSymbols.NoButtons)
+                    spin.valueChanged.connect(self._on_any_atr_ratio_changed)
+                    set_index_widget(spin_index, spin)
+                spin.setProperty("symbol", symbol)
+                spin.blockSignals(True)
+                spin.setValue(p_data.get('atr_ratio', 1.5))
+                spin.blockSignals(False)
 
             except Exception as e:
                 symbol = p_data.get('symbol', 'UNKNOWN')
                 logging.error(f"Error populating table for symbol {symbol}: {e}")
-        
-        # Re-enable sorting
-        self.table.setSortingEnabled(True)
-        # Restore previous sort if it existed
-        if current_sort_col != -1:
-            try:
-                self.table.sortItems(current_sort_col, current_sort_order)
-            except Exception as e:
-                logging.error(f"Error sorting table: {e}")
 
-    def on_atr_ratio_changed(self, row, symbol, value):
+        self._symbol_row_index = row_index
+
+    def _on_any_atr_ratio_changed(self, value):
+        """Dispatches a positions table ATR ratio spin box change to on_atr_ratio_changed."""
+        self.on_atr_ratio_changed(self.sender().property("symbol"), value)
+
+    def on_atr_ratio_changed(self, symbol, value):
         """
         Slot for when a user changes the ATR ratio spinbox.
         This method updates the internal state and triggers a recalculation.
@@ -1124,10 +1599,22 @@ class ATRWindow(QMainWindow):
         """
         # 1. Update the internal state for ATR ratios
         self.atr_ratios[symbol] = value
-        logging.info(f"User set ATR Ratio for {symbol} to {value:.1f}. Triggering recalculation.")
-
-        # 2. Trigger the recalculation for the specific row
-        self.recalculate_row(row)
+        # Lazy %-style args: the spin box can fire many times per second
+        logging.info("User set ATR Ratio for %s to %.1f. Triggering recalculation.", symbol, value)
+
+        # 2. Schedule the recalculation. Rows are resolved by symbol when the timer
+        # fires, since a refresh or sort may move the row in the meantime.
+        self._pending_ratio_symbols.add(symbol)
+        self._ratio_timer.start(150)
+
+    def _flush_ratio_changes(self):
+        """Recalculates the rows whose ATR ratio changed since the last flush."""
+        symbols = self._pending_ratio_symbols
+        self._pending_ratio_symbols = set()
+        for symbol in symbols:
+            row = self._symbol_row_index.get(symbol)
+            if row is not None:
+                self.recalculate_row(row)
 
     def recalculate_row(self, row):
         """
@@ -1140,11 +1627,12 @@ class ATRWindow(QMainWindow):
         p_data = self.positions_data[row]
         symbol = p_data['symbol']
 
-        # Use a temporary calculator instance for this single operation
-        # It uses the application's current state
-        calculator = PortfolioCalculator(
-            self.atr_state, {}, self.highest_stop_losses, self.atr_ratios, self.market_statuses
-        )
+        # Point the shared calculator at the application's current state
+        calculator = self._calc
+        calculator.atr_state = self.atr_state
+        calculator.highest_stop_losses = self.highest_stop_losses
+        calculator.atr_ratios = self.atr_ratios
+        calculator.market_statuses = self.market_statuses
 
         # Recalculate stop loss for this position, but WITHOUT applying the ratchet.
         # This gives the user immediate feedback on the stop level for that ratio.
@@ -1155,22 +1643,15 @@ class ATRWindow(QMainWindow):
         # Recalculate risk based on the new un-ratcheted stop
         new_risk_dollar, new_risk_percent = calculator.calculate_risk(p_data, new_stop)
 
-        # Update the UI with the new values
-        self.table.item(row, 9).setText(f"{new_stop:.4f}" if new_stop is not None and isinstance(new_stop, (int, float)) else "N/A")
-        
-        item_10 = self.table.item(row, 11)
-        if new_risk_dollar == "NO RISK":
-            item_10.setText("NO RISK")
-            item_10.setData(Qt.ItemDataRole.UserRole, 0)
-            item_10.setBackground(QColor(0, 50, 0))
-            item_10.setForeground(QColor('lightgreen'))
-        else:
-            item_10.setText(f"${new_risk_dollar:,.2f}")
-            item_10.setData(Qt.ItemDataRole.UserRole, new_risk_dollar)
-            item_10.setData(Qt.ItemDataRole.BackgroundRole, None)
-            item_10.setData(Qt.ItemDataRole.ForegroundRole, None)
-            
-        self.table.item(row, 12).setText(f"{new_risk_percent:.2f}%")
+        # Update the UI with the new values. The row dict is replaced with a copy,
+        # since the worker may still be reading the original for order submission.
+        p_data = dict(p_data)
+        p_data['computed_stop_loss'] = new_stop if isinstance(new_stop, (int, float)) else None
+        p_data['dollar_risk'] = new_risk_dollar
+        p_data['percent_risk'] = new_risk_percent
+        calculator.format_display_fields(p_data)
+        self.positions_data[row] = p_data
+        self.positions_model.row_changed(row, 9, 12)
 
     def get_atr_ratio_for_symbol(self, symbol):
         """Finds the ATR ratio for a symbol from the UI table."""
@@ -1181,18 +1662,17 @@ class ATRWindow(QMainWindow):
         """Load user settings from user_settings.json"""
         if os.path.exists(self.user_settings_file):
             try:
-                with open(self.user_settings_file, 'r') as f:
-                    settings = json.load(f)
-                    # Load client_id, defaulting to the pre-set value if not in file
-                    self.client_id = settings.get('client_id', self.client_id)
-                    self.trading_mode = settings.get('trading_mode', self.trading_mode)
-                    self.debug_log_enabled = settings.get('debug_log_enabled', True)
-                    self.debug_full_log_enabled = settings.get('debug_full_log_enabled', False)
-                    self.theme = settings.get('theme', self.theme)
-                    # Load symbol toggles
-                    self.symbol_stop_enabled = settings.get('symbol_stop_enabled', {})
-                    self.symbol_candle_size = settings.get('symbol_candle_size', {})
-                    self.column_widths = settings.get('column_widths', {})
+                settings = read_json(self.user_settings_file)
+                # Load client_id, defaulting to the pre-set value if not in file
+                self.client_id = settings.get('client_id', self.client_id)
+                self.trading_mode = settings.get('trading_mode', self.trading_mode)
+                self.debug_log_enabled = settings.get('debug_log_enabled', True)
+                self.debug_full_log_enabled = settings.get('debug_full_log_enabled', False)
+                self.theme = settings.get('theme', self.theme)
+                # Load symbol toggles
+                self.symbol_stop_enabled = settings.get('symbol_stop_enabled', {})
+                self.symbol_candle_size = settings.get('symbol_candle_size', {})
+                self.column_widths = settings.get('column_widths', {})
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Error loading user settings: {e}")
                 self.symbol_stop_enabled = {}
@@ -1204,29 +1684,39 @@ class ATRWindow(QMainWindow):
             self.column_widths = {}
 
     def save_user_settings(self):
-        """Save all user settings to user_settings.json"""
+        """Schedules a save of all user settings; calls within 500 ms share one write."""
+        if not self._save_timer.isActive():
+            self._save_timer.start(500)
+
+    def _do_save_user_settings(self, wait=False):
+        """
+        Save all user settings to user_settings.json on a pool thread.
+        With wait=True, blocks until the write has finished (used on exit).
+        """
         try:
             # Capture current column widths if table exists
             if hasattr(self, 'table'):
                 current_widths = {}
-                for i in range(self.table.columnCount()):
+                for i in range(self.positions_model.columnCount()):
                     current_widths[str(i)] = self.table.columnWidth(i)
                 self.column_widths = current_widths
 
-            with open(self.user_settings_file, 'w') as f:
-                settings_to_save = {
-                    'client_id': self.client_id,
-                    'trading_mode': self.trading_mode,
-                    'debug_log_enabled': self.debug_log_enabled,
-                    'debug_full_log_enabled': self.debug_full_log_enabled,
-                    'theme': self.theme,
-                    'symbol_stop_enabled': self.symbol_stop_enabled,
-                    'symbol_candle_size': self.symbol_candle_size,
-                    'column_widths': self.column_widths,
-                    # Add any other settings here in the future
-                }
-                json.dump(settings_to_save, f, indent=2)
-            logging.info("User settings saved successfully")
+            settings_to_save = {
+                'client_id': self.client_id,
+                'trading_mode': self.trading_mode,
+                'debug_log_enabled': self.debug_log_enabled,
+                'debug_full_log_enabled': self.debug_full_log_enabled,
+                'theme': self.theme,
+                'symbol_stop_enabled': self.symbol_stop_enabled,
+                'symbol_candle_size': self.symbol_candle_size,
+                'column_widths': self.column_widths,
+                # Add any other settings here in the future
+            }
+            # Encoded here, so the pool thread never sees the live dicts.
+            # Kept indented: it is tiny and the file users are most likely to open.
+            self._settings_save_task.submit(dumps(settings_to_save, pretty=True))
+            if wait:
+                QThreadPool.globalInstance().waitForDone()
         except Exception as e:
             print(f"Error saving user settings: {e}")
 
@@ -1240,12 +1730,16 @@ class ATRWindow(QMainWindow):
     def get_all_candle_sizes(self):
         return self.symbol_candle_size
 
+    def _on_any_candle_size_changed(self, text):
+        """Dispatches a positions table candle combo change to on_candle_size_changed."""
+        self.on_candle_size_changed(self.sender().property("symbol"), text)
+
     def on_candle_size_changed(self, symbol, new_size):
         current_size = self.get_candle_size(symbol)
         if current_size == new_size:
             return
 
-        logging.info(f"Candle size for {symbol} changed from {current_size} to {new_size}. Wiping history.")
+        logging.info("Candle size for %s changed from %s to %s. Wiping history.", symbol, current_size, new_size)
         self.set_candle_size(symbol, new_size)
 
         # Wipe ATR state and history to force re-initialization
@@ -1263,71 +1757,49 @@ class ATRWindow(QMainWindow):
         if self.symbol_selector.currentText() == symbol:
             self.update_atr_graph()
 
+    def _on_any_symbol_toggle_changed(self, state):
+        """Dispatches a positions table checkbox toggle to on_symbol_toggle_changed."""
+        self.on_symbol_toggle_changed(self.sender().property("symbol"), state)
+
     def on_symbol_toggle_changed(self, symbol, state):
         """Handles when a user toggles the checkbox for an individual symbol."""
         is_enabled = state == Qt.CheckState.Checked.value
         self.symbol_stop_enabled[symbol] = is_enabled
-        logging.info(f"Stop loss submission for {symbol} set to: {'ENABLED' if is_enabled else 'DISABLED'}")
+        logging.info("Stop loss submission for %s set to: %s", symbol, 'ENABLED' if is_enabled else 'DISABLED')
 
         # If the user disables the symbol, reset its stop loss ratchet.
         if not is_enabled and symbol in self.highest_stop_losses:
             del self.highest_stop_losses[symbol]
             self.save_stop_history() # Persist the change immediately
             # self.log_to_ui(f"Ratchet for {symbol} has been reset. Its stop loss history is cleared.")
-            logging.info(f"Removed {symbol} from highest_stop_losses to reset ratchet.")
+            logging.info("Removed %s from highest_stop_losses to reset ratchet.", symbol)
 
     def populate_atr_table(self):
         """Populate the ATR Calculations table"""
-        self.atr_table.setRowCount(len(self.atr_symbols))
-        for i in range(len(self.atr_symbols)):
-            # Symbol (read-only)
-            symbol_item = QTableWidgetItem(self.atr_symbols[i])
-            symbol_item.setFlags(symbol_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.atr_table.setItem(i, 0, symbol_item)
-
-            # Previous ATR (read-only)
-            prev_atr = self.previous_atr_values[i]
-            if prev_atr is None:
-                prev_atr_item = QTableWidgetItem("N/A")
-            else:
-                prev_atr_item = QTableWidgetItem(f"{prev_atr:.2f}")
-            prev_atr_item.setFlags(prev_atr_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.atr_table.setItem(i, 1, prev_atr_item)
-
-            # TR (read-only)
-            tr_value = self.tr_values[i]
-            tr_display = f"{tr_value:.2f}" if tr_value is not None else "N/A"
-            tr_item = QTableWidgetItem(tr_display)
-            tr_item.setFlags(tr_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.atr_table.setItem(i, 2, tr_item)
-
-            # ATR (editable)
-            atr_item = QTableWidgetItem(f"{self.atr_calculated[i]:.2f}" if self.atr_calculated[i] is not None else "N/A")
-            atr_item.setFlags(atr_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.atr_table.setItem(i, 3, atr_item)
+        self.atr_model.set_rows(self.atr_symbols, self._atr_arr)
 
     def load_stop_history(self):
         """Load the persistent stop loss history from stop_history.json."""
         if os.path.exists(self.stop_history_file):
             try:
-                with open(self.stop_history_file, 'r') as f:
-                    history = json.load(f)
-                    if not isinstance(history, dict):
-                        logging.warning(f"Stop history file is corrupt (not a dictionary). Ignoring. Path: {self.stop_history_file}")
-                        return {}
-                    logging.info(f"Loaded {len(history)} symbols from stop history.")
-                    return history
+                history = read_json(self.stop_history_file)
+                if not isinstance(history, dict):
+                    logging.warning(f"Stop history file is corrupt (not a dictionary). Ignoring. Path: {self.stop_history_file}")
+                    return {}
+                logging.info(f"Loaded {len(history)} symbols from stop history.")
+                return history
             except (json.JSONDecodeError, IOError) as e:
                 logging.error(f"Error loading stop history: {e}")
                 return {}
         return {}
 
     def save_stop_history(self):
-        """Save the current highest stop losses to stop_history.json."""
+        """Save the current highest stop losses to stop_history.json on a pool thread."""
+        self._stops_save_timer.stop() # A pending debounced save would now be redundant
         try:
-            with open(self.stop_history_file, 'w') as f:
-                json.dump(self.highest_stop_losses, f, indent=2)
-            logging.info("Stop history saved successfully.")
+            snapshot = dict(self.highest_stop_losses)
+            self._stop_history_save_task.submit(dumps(snapshot))
+            self._saved_stops = snapshot
         except Exception as e:
             logging.error(f"Error saving stop history: {e}")
 
@@ -1335,44 +1807,36 @@ class ATRWindow(QMainWindow):
         """Load ATR history for graphing from JSON file"""
         if os.path.exists(self.atr_history_file):
             try:
-                with open(self.atr_history_file, 'r') as f:
-                    return json.load(f)
+                return read_json(self.atr_history_file)
             except (json.JSONDecodeError, IOError) as e:
                 logging.error(f"Error loading ATR history: {e}")
                 return {}
         return {}
 
     def save_atr_history(self):
-        """Save ATR history for graphing to JSON file"""
-        with self.atr_history_file_lock:
-            try:
-                with open(self.atr_history_file, 'w') as f:
-                    json.dump(self.atr_history, f, indent=2)
-                logging.info("ATR history saved successfully.")
-            except Exception as e:
-                logging.error(f"Error saving ATR history: {e}")
+        """Save ATR history for graphing to JSON file on a pool thread"""
+        try:
+            self._atr_history_save_task.submit(dumps(self.atr_history))
+        except Exception as e:
+            logging.error(f"Error saving ATR history: {e}")
 
     def load_atr_state(self):
         """Load ATR state (TR history and last ATR) from JSON file"""
         if os.path.exists(self.atr_state_file):
             try:
-                with open(self.atr_state_file, 'r') as f:
-                    # The new format is just the history dictionary
-                    return json.load(f)
+                # The new format is just the history dictionary
+                return read_json(self.atr_state_file)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Error loading ATR state: {e}")
                 return {}
         return {}
     
     def save_atr_state(self):
-        """Save ATR state to JSON file"""
-        with self.atr_state_file_lock:
-            try:
-                with open(self.atr_state_file, 'w') as f:
-                    json.dump(self.atr_state, f, indent=2)
-                logging.info("ATR state saved successfully")
-            except Exception as e:
-                print(f"Error saving ATR state: {e}")
+        """Save ATR state to JSON file on a pool thread"""
+        try:
+            self._atr_state_save_task.submit(dumps(self.atr_state))
+        except Exception as e:
+            print(f"Error saving ATR state: {e}")
 
     def start_full_refresh(self):
         """Starts the first stage of the data loading sequence."""
@@ -1382,16 +1846,29 @@ class ATRWindow(QMainWindow):
         self.start_worker()
 
     def start_worker(self):
-        """Creates and starts a single worker for the entire refresh cycle."""
-        if self.worker_thread and self.worker_thread.isRunning():
-            logging.warning("Refresh already in progress. Skipping new request.")
+        """Starts a refresh cycle on the persistent worker thread."""
+        if self._refresh_running:
+            # Coalesce: however many requests arrive now, run one more cycle afterwards
+            logging.info("Refresh already in progress. Queuing one follow-up refresh.")
+            self._refresh_pending = True
             return
 
+        if self.worker is None:
+            self._create_worker()
+
+        self._refresh_running = True
+        # Queued to the worker thread; pass the stable client ID and the table's sort
+        self.refresh_requested.emit(self.client_id, self.current_positions_sort())
+        logging.info("Worker started for full refresh cycle.")
+
+    def _create_worker(self):
+        """Creates the worker and its thread once; both live until the window closes."""
         self.worker_thread = QThread()
-        self.worker = DataWorker(self, self.client_id) # Pass the stable client ID
+        self.worker = DataWorker(self)
         self.worker.moveToThread(self.worker_thread)
 
-        self.worker_thread.started.connect(self.worker.run)
+        self.refresh_requested.connect(self.worker.run)
+        self.shutdown_requested.connect(self.worker.shutdown)
         self.worker.finished.connect(self.on_worker_finished)
         self.worker.error.connect(self.handle_data_error)
         self.worker.log_message.connect(self.log_to_ui)
@@ -1402,34 +1879,32 @@ class ATRWindow(QMainWindow):
         self.worker.stops_updated.connect(self.handle_stops_updated)
 
         self.worker_thread.start()
-        logging.info("Worker started for full refresh cycle.")
 
     def on_worker_finished(self, success):
         """Called when the worker's run() method completes."""
         logging.info("Worker has finished all stages.")
+        self._refresh_running = False
         self.update_status(success)
         self.update_timestamp()
+        if self._refresh_pending:
+            self._refresh_pending = False
+            QTimer.singleShot(0, self.start_full_refresh)
 
     def update_timestamp(self):
         """Updates the 'Data Pulled' timestamp in the UI."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = time.strftime("%H:%M:%S")
         self.last_pull_time.setText(timestamp)
-
-        # Cleanly shut down the thread and worker
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.quit()
-            self.worker_thread.wait()
-        
-        self.worker_thread.deleteLater()
-        self.worker.deleteLater()
-        self.worker_thread = None
     
     def handle_data_ready(self, positions_data, updated_atr_state, updated_atr_history):
         """Handles the fully processed data from the worker. The 'atr_history' is now TR history."""
         logging.info(f"Data ready: Received {len(positions_data)} fully processed positions.")
         if not positions_data:
-            self.table.setRowCount(0)
-            self.atr_table.setRowCount(0)
+            self.positions_data = []
+            self._symbol_row_index = {}
+            self.positions_model.set_rows(self.positions_data, self.symbol_stop_enabled, self.market_statuses)
+            self.atr_symbols = []
+            self._atr_arr = np.empty((0, 3), dtype=np.float64)
+            self.populate_atr_table()
             return
 
         # --- CRITICAL: Update the main window's history state from the worker ---
@@ -1438,35 +1913,51 @@ class ATRWindow(QMainWindow):
         logging.info(f"Main window ATR state updated with {len(self.atr_state)} symbols.")
         logging.info(f"Main window ATR history updated with {len(self.atr_history)} symbols.")
 
-        self.positions_data = positions_data
-
-        # Update ATR table data from the processed positions
-        self.atr_symbols = [p['symbol'] for p in self.positions_data]
-        self.tr_values = [p.get('tr') for p in self.positions_data] # Can be None, handled in populate_atr_table
-        self.atr_calculated = [p.get('atr_value') for p in self.positions_data]
-        self.previous_atr_values = [p.get('previous_atr') for p in self.positions_data] # Assuming this is added
+        # Keep our own list: the model sorts it in place and recalculate_row swaps
+        # rows, neither of which should touch the worker's list.
+        self.positions_data = list(positions_data)
 
-        # Update the contract details map, which was previously in update_raw_data_view
+        # Update ATR table data and the contract details map from the processed
+        # positions in a single pass
+        self.atr_symbols = []
+        atr_rows = []
         for p in self.positions_data:
-            self.contract_details_map[p['symbol']] = p['contract_details']
+            symbol = p['symbol']
+            self.atr_symbols.append(symbol)
+            atr_rows.append((p.get('previous_atr'), p.get('tr'), p.get('atr_value')))
+            self.contract_details_map[symbol] = p['contract_details']
+        # None (no data yet) becomes NaN in a float array
+        self._atr_arr = np.array(atr_rows, dtype=np.float64).reshape(-1, 3)
 
         # Update UI
         self.populate_atr_table()
-        self.populate_positions_table()
+        self.populate_positions_table(sorted_by=self.worker.positions_sort)
         self.populate_symbol_selector() # Populate the new dropdown
 
     def handle_stops_updated(self, updated_stops):
-        """Receives the updated stop dictionary from the worker and saves it."""
+        """
+        Receives the updated stop dictionary from the worker and schedules a save
+        if it differs from what was last written.
+        """
         logging.info("Main thread received updated stop-loss dictionary from worker.")
         self.highest_stop_losses = updated_stops
-        self.save_stop_history() # Persist the changes
+        if updated_stops == self._saved_stops:
+            return
+        if not self._stops_save_timer.isActive():
+            self._stops_save_timer.start(2000)
 
 
     def handle_orders_submitted(self, order_results):
         """Stage 4: Order submission is complete. Update statuses."""
         logging.info("Stage 4 Complete: Processed order submissions.")
-        self.process_order_results(order_results)
-        self.populate_positions_table() # Repopulate to show final statuses
+        updated_rows = self.process_order_results(order_results)
+        current_sort = self.current_positions_sort()
+        if current_sort is not None and current_sort[0] == 13:
+            self.populate_positions_table() # Sorted by status, so the rows may move
+        else:
+            # Only the Status cells of the affected rows need repainting
+            for row in updated_rows:
+                self.positions_model.row_changed(row, 13, 13)
 
     def handle_data_error(self, error_message):
         """Slot to handle errors from the worker thread."""
@@ -1475,30 +1966,29 @@ class ATRWindow(QMainWindow):
         self.update_status(False)
 
     def process_order_results(self, results):
-        """Updates the UI based on the results of order submissions."""
+        """
+        Updates position statuses from the results of order submissions.
+        Returns the table rows that were changed.
+        """
         if not results:
             logging.info("No order submission results to process.")
-            return
+            return []
 
+        updated_rows = []
+        timestamp = time.strftime("%H:%M:%S") # One timestamp for the whole batch
         for result in results:
             symbol = result.get('symbol', 'Unknown')
-            status = result.get('status', 'unknown')
-            
+            status_format = ORDER_STATUS_FORMATS.get(result.get('status', 'unknown'))
+
             # Find the corresponding position data and update its status
-            for p_data in self.positions_data:
-                if p_data['symbol'] == symbol:
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    message = result.get('message', 'Unknown')
-
-                    if status in ['submitted', 'unchanged']:
-                        p_data['status'] = f"Order Updated - {timestamp}"
-                    elif status == 'held':
-                        p_data['status'] = f"Held - {message}"
-                    elif status == 'pending':
-                        p_data['status'] = f"Order Rejected - {message}"
-                    elif status in ['error', 'skipped']:
-                        p_data['status'] = f"Error - {message}"
-                    break
+            row = self._symbol_row_index.get(symbol)
+            if row is None or status_format is None:
+                continue
+            self.positions_data[row]['status'] = status_format.format(
+                timestamp=timestamp, message=result.get('message', 'Unknown')
+            )
+            updated_rows.append(row)
+        return updated_rows
 
     def on_adaptive_stop_toggled(self, state):
         """Handles the state change of the adaptive stop loss toggle switch."""
@@ -1528,21 +2018,21 @@ def main():
             "PaceChaser.App"
         )
 
+    # --pretty-state writes the ATR/stop state files indented, for debugging
+    if "--pretty-state" in sys.argv:
+        sys.argv.remove("--pretty-state")
+        storage.set_pretty(True)
+
     app = QApplication(sys.argv)
-    
-    # Robust icon loading with fallback
-    icon_name = "PaceChaser.ico"
-    icon_path = resource_path(os.path.join("windows assets", icon_name))
-    
-    # Fallback: Check root directory if not found in subfolder (common in frozen builds)
-    if not os.path.exists(icon_path):
-        fallback_path = resource_path(icon_name)
-        if os.path.exists(fallback_path):
-            icon_path = fallback_path
-        else:
-            logging.warning(f"Icon file not found at: {icon_path} or {fallback_path}")
 
-    app_icon = QIcon(icon_path)
+    # Application-wide font (previously set by a universal QWidget stylesheet rule)
+    font = QFont()
+    font.setFamilies(["Segoe UI", "Helvetica Neue", "Helvetica", "Arial"])
+    font.setStyleHint(QFont.StyleHint.SansSerif)
+    font.setPointSize(10)
+    app.setFont(font)
+    
+    app_icon = _app_icon()
     app.setWindowIcon(app_icon)
     window = ATRWindow()
     window.setWindowIcon(app_icon) # Explicitly set on window as well
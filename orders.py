@@ -2,19 +2,54 @@
 import asyncio
 import logging
 import struct
-from functools import lru_cache
-from datetime import datetime
 from typing import Dict, List
 
 from ib_insync import IB, Contract, StopOrder, Trade
 from PyQt6.QtCore import pyqtSignal
 
+# Order statuses that count as a successfully placed stop
+_ACCEPTED_STATUSES = frozenset({'Submitted', 'PreSubmitted', 'PendingSubmit'})
+
+# Tick size assumed when a contract's minTick is unknown
+_DEFAULT_TICK = 1e-4
+
+
+def _same_stop(a: float, b: float, tick: float) -> bool:
+    """True if two stop prices fall on the same tick, i.e. are less than half a tick apart."""
+    return abs(a - b) < tick / 2
+
+
+def _index_stops(ib: IB) -> Dict[str, Trade]:
+    """Indexes the STP trades in ib.openTrades() by orderRef, keeping the first match per ref."""
+    stops: Dict[str, Trade] = {}
+    for trade in ib.openTrades():
+        if trade.order.orderType == 'STP':
+            stops.setdefault(trade.order.orderRef, trade)
+    return stops
+
+
+def _unchanged_result(symbol: str, stop_price: float) -> dict:
+    logging.info(f"{symbol}: stop unchanged at {stop_price:.4f}")
+    return {
+        'symbol': symbol,
+        'status': 'unchanged',
+        'message': f'Stop held at {stop_price:.4f}'
+    }
+
+# symbol -> orderRef, filled by get_order_ref
+_ORDER_REF_CACHE: Dict[str, str] = {}
+
+# symbol -> stop price last submitted or confirmed unchanged by process_stop_orders
+_LAST_SUBMITTED: Dict[str, float] = {}
+
 
-@lru_cache(maxsize=None)
 def get_order_ref(symbol: str) -> str:
     """Create a deterministic, unique, and valid orderRef for a symbol."""
-    # Create a simple, clean reference string for the order.
-    return f"atr_stop_{symbol.lower().replace('.', '_')}"
+    ref = _ORDER_REF_CACHE.get(symbol)
+    if ref is None:
+        # Create a simple, clean reference string for the order.
+        ref = _ORDER_REF_CACHE[symbol] = f"atr_stop_{symbol.lower().replace('.', '_')}"
+    return ref
 
 async def get_active_stop_symbols(ib: IB) -> set[str]:
     """
@@ -35,20 +70,42 @@ async def get_active_stop_symbols(ib: IB) -> set[str]:
         logging.error(f"Reconciliation: Error fetching active stop symbols: {e}")
     return active_symbols
 
+async def _wait_for_status(trade: Trade, statuses, timeout: float = 2.0) -> bool:
+    """
+    Waits until the trade's order status is one of statuses, woken by the
+    trade's statusEvent rather than polling. Returns False on timeout.
+    """
+    if trade.orderStatus.status in statuses:
+        return True
+    fut = asyncio.get_running_loop().create_future()
+
+    def on_status(updated_trade):
+        if updated_trade.orderStatus.status in statuses and not fut.done():
+            fut.set_result(None)
+
+    trade.statusEvent += on_status
+    try:
+        await asyncio.wait_for(fut, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        trade.statusEvent -= on_status
+
 async def _submit_or_modify_single_order(
-    ib: IB, symbol: str, order_data: dict
+    ib: IB, symbol: str, order_data: dict, contract: Contract, existing_stops: Dict[str, Trade]
 ):
     """
     Submit a new stop loss order OR replace an existing one for a single symbol.
     Fully compatible with ib_insync:
-    - Uses ib.openOrders() for live snapshot
+    - Expects contract to be qualified already (done in one batch by the caller)
+    - Looks up the existing stop in existing_stops ({orderRef: Trade})
     - Cancels existing stops safely
     - Places new StopOrder
+    The caller has already answered unchanged stops without calling this.
     """
-    contract_details = order_data['contract_details']
     quantity = order_data['quantity']
     stop_price = float(order_data['stop_price'])
-    con_id = contract_details['conId']
 
     try:
         # Determine action based on position
@@ -56,47 +113,20 @@ async def _submit_or_modify_single_order(
         total_quantity = abs(quantity)
         order_ref = get_order_ref(symbol)
 
-        # 1. Qualify contract
-        contract = Contract(conId=con_id)
-        await ib.qualifyContractsAsync(contract)
-
-        # 2. Get all open trades from the live state.
-        # This is done inside the task to avoid race conditions with other concurrent tasks.
-        # ib.openTrades() contains all live trades after reqAllOpenOrdersAsync() is called.
-        open_trades = ib.openTrades()
-        logging.debug(f"Found {len(open_trades)} live trades to check against for {symbol}.")
-
-        # 3. Look for existing stop
-        existing_trade: Trade | None = None
-        for trade in open_trades:
-            # Filter by orderRef (deterministic) and order type.
-            if trade.order.orderRef == order_ref and trade.order.orderType == 'STP':
-                existing_trade = trade
-                logging.info(f"Found existing stop for {symbol} with OrderId {trade.order.orderId}")
-                break
+        # 2-3. Look for existing stop by its deterministic orderRef
+        existing_trade: Trade | None = existing_stops.get(order_ref)
+        if existing_trade:
+            logging.info(f"Found existing stop for {symbol} with OrderId {existing_trade.order.orderId}")
 
         # 4. Cancel existing order if needed
         if existing_trade:
             existing_order = existing_trade.order
-            existing_stop = getattr(existing_order, 'stopPrice', 0.0)
-            if round(existing_stop, 4) == round(stop_price, 4):
-                logging.info(f"{symbol}: stop unchanged at {stop_price:.4f}")
-                return {
-                    'symbol': symbol,
-                    'status': 'unchanged',
-                    'message': f'Stop held at {stop_price:.4f}'
-                }
-
             logging.info(f"Cancelling existing stop for {symbol} (OrderId {existing_order.orderId})")
             ib.cancelOrder(existing_order)
 
-            # Poll until cancellation confirmed
-            for _ in range(20):  # 2 seconds max
-                await asyncio.sleep(0.1)
-                # Poll the status from the trade object's orderStatus.
-                if existing_trade.orderStatus.status == 'Cancelled':
-                    logging.info(f"Cancellation confirmed for OrderId {existing_order.orderId}")
-                    break
+            # Wait (2 seconds max) for the cancellation to be confirmed
+            if await _wait_for_status(existing_trade, {'Cancelled'}):
+                logging.info(f"Cancellation confirmed for OrderId {existing_order.orderId}")
             else:
                 logging.warning(f"Timeout waiting for cancellation of OrderId {existing_order.orderId}")
                 # Continue anyway, as the order is likely being cancelled.
@@ -112,15 +142,11 @@ async def _submit_or_modify_single_order(
         )
         trade: Trade = ib.placeOrder(contract, new_order)
 
-        # 6. Wait for status update
-        for _ in range(20):  # 2 seconds max
-            await asyncio.sleep(0.1)
-            status = trade.orderStatus.status
-            if status in {'Submitted', 'PreSubmitted', 'PendingSubmit'}:
-                break
+        # 6. Wait (2 seconds max) for the order to be accepted
+        await _wait_for_status(trade, _ACCEPTED_STATUSES)
 
         final_status = trade.orderStatus.status if trade.orderStatus else "Unknown"
-        if final_status in {'Submitted', 'PreSubmitted', 'PendingSubmit'}:
+        if final_status in _ACCEPTED_STATUSES:
             logging.info(f"{symbol} stop submitted successfully at {stop_price:.4f}")
             return {
                 'symbol': symbol,
@@ -157,26 +183,91 @@ async def process_stop_orders(
         logging.info("No stop orders to process.")
         return []
 
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    # 6. Log high-level info from the main orchestrator function.
-    # log_signal.emit(f"--- [{timestamp}] Submitting Stops ---")
-
-    for symbol, data in orders_to_submit.items():
-        stop_price = data['stop_price']
-        # log_signal.emit(
-        #     f"  {symbol}: Stop = {stop_price:.4f} "
-        #     f"(Raw: 0x{struct.pack('>d', stop_price).hex()})"
-        # )
-        
-    # 7. Centralize broker state refresh and create a read-only snapshot.
-    await ib.reqAllOpenOrdersAsync()
-    logging.info(f"Refreshed open orders. Found {len(ib.openOrders())} total open orders.")
-
-    # 8. Create and execute concurrent tasks, passing the snapshot.
-    tasks = [
-        _submit_or_modify_single_order(ib, symbol, data)
-        for symbol, data in orders_to_submit.items()
-    ]
-
-    # 9. Gather results from all concurrent tasks.
-    return await asyncio.gather(*tasks)
+    # 6. Log high-level info from the main orchestrator function, as one record.
+    # The raw bit patterns are only worth packing when debug output is on.
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        lines = [
+            f"  {symbol}: Stop = {data['stop_price']:.4f} "
+            f"(Raw: 0x{struct.pack('>d', data['stop_price']).hex()})"
+            for symbol, data in orders_to_submit.items()
+        ]
+        logging.debug("--- Submitting Stops ---\n" + "\n".join(lines))
+
+    results = {}
+    pending = orders_to_submit
+    if _LAST_SUBMITTED:
+        # A target equal to the stop this process last placed or confirmed can be
+        # answered from the trades ib_insync already tracks locally, provided that
+        # stop is still live there (not filled or cancelled). Only the rest need
+        # the open-order refresh, so quiet cycles skip the broker round trip.
+        local_stops = _index_stops(ib)
+        pending = {}
+        for symbol, data in orders_to_submit.items():
+            stop_price = float(data['stop_price'])
+            tick = data['contract_details'].get('minTick') or _DEFAULT_TICK
+            last = _LAST_SUBMITTED.get(symbol)
+            local_trade = local_stops.get(get_order_ref(symbol))
+            if (last is not None and local_trade is not None
+                    and _same_stop(last, stop_price, tick)
+                    and _same_stop(getattr(local_trade.order, 'stopPrice', 0.0), stop_price, tick)):
+                results[symbol] = _unchanged_result(symbol, stop_price)
+            else:
+                pending[symbol] = data
+
+    to_submit = {}
+    if pending:
+        # 7. Centralize broker state refresh and create a read-only snapshot.
+        await ib.reqAllOpenOrdersAsync()
+        # ib.openTrades() contains all live trades after reqAllOpenOrdersAsync() is called.
+        # Index our stops by orderRef once for all tasks.
+        existing_stops = _index_stops(ib)
+        logging.info(f"Refreshed open orders. Found {len(ib.openOrders())} total open orders.")
+
+        # Stops already at the target price need no contract qualification or broker
+        # round trip; answer them here and only hand the rest to the tasks.
+        for symbol, data in pending.items():
+            existing_trade = existing_stops.get(get_order_ref(symbol))
+            stop_price = float(data['stop_price'])
+            tick = data['contract_details'].get('minTick') or _DEFAULT_TICK
+            if existing_trade and _same_stop(getattr(existing_trade.order, 'stopPrice', 0.0), stop_price, tick):
+                results[symbol] = _unchanged_result(symbol, stop_price)
+            else:
+                to_submit[symbol] = data
+
+    if to_submit:
+        # Qualify every contract in one batched call rather than one per task
+        contracts = {
+            symbol: Contract(conId=data['contract_details']['conId'])
+            for symbol, data in to_submit.items()
+        }
+        try:
+            await ib.qualifyContractsAsync(*contracts.values())
+        except Exception as e:
+            logging.exception(f"Error qualifying contracts for stop orders: {e}")
+            for symbol in to_submit:
+                results[symbol] = {'symbol': symbol, 'status': 'error', 'message': str(e)}
+            to_submit = {}
+
+        # 8. Create and execute concurrent tasks, passing the snapshot.
+        tasks = [
+            _submit_or_modify_single_order(ib, symbol, data, contracts[symbol], existing_stops)
+            for symbol, data in to_submit.items()
+        ]
+
+        # 9. Gather results from all concurrent tasks. An exception escaping one task
+        # must not discard the others' results, so fold it into an error result.
+        task_results = await asyncio.gather(*tasks, return_exceptions=True)
+        for symbol, result in zip(to_submit, task_results):
+            if isinstance(result, BaseException):
+                result = {'symbol': symbol, 'status': 'error', 'message': str(result)}
+            results[symbol] = result
+
+    # Remember accepted stops for the next cycle; forget failed ones so they're retried
+    for symbol, result in results.items():
+        if result.get('status') in ('submitted', 'unchanged'):
+            _LAST_SUBMITTED[symbol] = float(orders_to_submit[symbol]['stop_price'])
+        else:
+            _LAST_SUBMITTED.pop(symbol, None)
+
+    # Report in the order the stops were requested
+    return [results[symbol] for symbol in orders_to_submit]
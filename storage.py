@@ -0,0 +1,127 @@
+# storage.py
+import json
+import mmap
+import os
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library encoder if orjson is not installed.
+    orjson = None
+
+# State files are machine-read, so they are written compactly unless
+# pretty-printing is switched on for debugging (see set_pretty).
+_pretty = False
+
+# Files at least this large are decoded straight from a memory map instead of
+# being read into a bytes copy first
+_MMAP_THRESHOLD = 1024 * 1024
+
+# path -> (st_mtime_ns, st_size, bytes) for the contents last read or written
+# through this module. An entry is only trusted while the file's stat matches.
+_file_cache = {}
+
+
+def set_pretty(enabled):
+    """Makes dumps() emit indented JSON by default (the --pretty-state flag)."""
+    global _pretty
+    _pretty = bool(enabled)
+
+
+def dumps(obj, pretty=None) -> bytes:
+    """
+    Encodes an object as UTF-8 JSON bytes: compact, or indented if pretty is
+    true. pretty=None uses the module default set by set_pretty().
+    """
+    if pretty is None:
+        pretty = _pretty
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Decodes JSON from bytes or str. Raises json.JSONDecodeError on bad input."""
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError, so callers
+    # can keep catching the stdlib exception type with either backend.
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _cached_bytes(path, st):
+    """Returns the cached contents of path if the file hasn't changed since, else None."""
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    return None
+
+
+def _remember(path, data):
+    st = os.stat(path)
+    _file_cache[path] = (st.st_mtime_ns, st.st_size, data)
+
+
+def read_json(path):
+    """
+    Reads and decodes a JSON file. If the file is unchanged since it was last
+    read or written here, the cached bytes are decoded instead of re-reading it.
+    Always returns a freshly decoded object, so callers may mutate it.
+    """
+    st = os.stat(path)
+    data = _cached_bytes(path, st)
+    if data is not None:
+        return loads(data)
+    if orjson is not None and st.st_size >= _MMAP_THRESHOLD:
+        # orjson decodes from any buffer, so large files skip the read() copy.
+        # They aren't cached either, which would need that copy.
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    with open(path, 'rb') as f:
+        data = f.read()
+    _remember(path, data)
+    return loads(data)
+
+
+def write_json(path, obj):
+    """Encodes an object and atomically replaces the JSON file with it."""
+    return write_bytes(path, dumps(obj))
+
+
+def write_bytes(path, data):
+    """
+    Atomically replaces a file with already-encoded data (e.g. from dumps()).
+    The data is written and fsynced to a sibling .tmp file first, so a crash
+    or power loss mid-write never leaves a truncated file behind.
+    Returns False without touching the disk if the file is known to already
+    hold exactly this data.
+    """
+    try:
+        if _cached_bytes(path, os.stat(path)) == data:
+            return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            # Make sure the bytes are on disk before the rename makes them visible
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        _file_cache.pop(path, None)
+        # Don't leave a partial .tmp file behind; the original file is untouched.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _remember(path, data)
+    return True